@@ -1,5 +1,9 @@
 from fastapi import APIRouter, HTTPException, Header
 from backend.shared.auth import approve_user, deny_user, get_all_users, get_pending_users, get_user_from_token,update_user_role
+from backend.shared.cache import all_cache_stats
+from backend.shared.compaction import prompt_stats
+from backend.shared.genai_clients import genai_clients
+from backend.shared.ratelimit import llm_rate_limiter
 
 
 
@@ -68,3 +72,36 @@ async def change_role(username: str, role: str, authorization: str = Header(None
 
     return {"updated": update_user_role(username, role)}
 
+
+# -----------------------------
+# ✅ ADMIN: CACHE STATS
+# -----------------------------
+@router.get("/admin/cache-stats")
+async def cache_stats(authorization: str = Header(None)):
+    token = authorization.replace("Bearer ", "")
+    admin = get_user_from_token(token)
+
+    if not admin or admin["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    return all_cache_stats()
+
+
+# -----------------------------
+# ✅ ADMIN: LLM RATE LIMITS
+# -----------------------------
+@router.get("/admin/llm-usage")
+async def llm_usage(authorization: str = Header(None)):
+    token = authorization.replace("Bearer ", "")
+    admin = get_user_from_token(token)
+
+    if not admin or admin["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    return {
+        # per (API key hash, model): budgets, last-minute utilization, queue depth, 429s
+        "limiters": llm_rate_limiter.stats(),
+        "clients": genai_clients.stats(),
+        # input tokens before / after prompt compaction, per prompt kind
+        "prompts": prompt_stats.stats(),
+    }
@@ -1,6 +1,11 @@
 # db_fetcher.py
-from typing import List
-from pymongo import MongoClient
+import os
+import asyncio
+from itertools import islice
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List
+from backend.fetch_from_db_backend.query_planner import QueryPlan, ensure_candidate_indexes
+from backend.shared.mongo import async_mongo_client, mongo_client
 from backend.shared.schema import ResumeDBSchema
 
 def clean_mongo_doc(doc: dict) -> dict:
@@ -19,30 +24,98 @@ def clean_mongo_doc(doc: dict) -> dict:
     return doc
 
 
-def fetch_resumes(mongo_url: str, db_name: str, collection: str,jd_skills: List[str]=None):
-    client = MongoClient(mongo_url)
-    db = client[db_name]
-    coll = db[collection]
+# Only what scoring and the response need; _id and any extra top-level fields stay on the server
+SCORING_PROJECTION = {"_id": 0, "resume_json": 1, "evaluations": 1}
+FETCH_BATCH_SIZE = int(os.getenv("MONGO_FETCH_BATCH_SIZE", "200"))
 
-    query={}
-    if jd_skills:
-        query["resume_json.skills"]={"$in":jd_skills}
 
-    documents = list(coll.find(query))
-    if not documents:
-        raise ValueError("No resumes found in database.")
+def _validate_resume(doc: dict):
+    clean_doc = clean_mongo_doc(doc)
+    try:
+        return ResumeDBSchema(**clean_doc).model_dump()
+    except Exception as e:
+        print("❌ Invalid resume skipped:", e)
+        return None
+
+
+@contextmanager
+def leased_collection(mongo_url: str, db_name: str, collection: str):
+    """Collection on the pooled client, which stays open until the block exits."""
+    with mongo_client(mongo_url) as client:
+        yield client[db_name][collection]
+
 
-    validated_resumes = []
+@asynccontextmanager
+async def aleased_collection(mongo_url: str, db_name: str, collection: str):
+    """leased_collection for async routes: connecting never blocks the event loop."""
+    async with async_mongo_client(mongo_url) as client:
+        yield client[db_name][collection]
 
-    for doc in documents:
-        clean_doc = clean_mongo_doc(doc)
 
+def iter_resumes(mongo_url: str, db_name: str, collection: str, jd_skills: List[str]=None, *, batch_size: int = FETCH_BATCH_SIZE, plan: QueryPlan = None) -> Iterator[dict]:
+    """
+    Stream validated resumes from a server-side cursor, `batch_size` documents
+    per round-trip. Each document is validated only when it is consumed, so
+    memory stays flat regardless of collection size.
+
+    With a QueryPlan the filtering (skills, experience, location, recency,
+    limit) is pushed down to MongoDB; otherwise only the exact jd_skills $in.
+    """
+    with leased_collection(mongo_url, db_name, collection) as coll:
+        yield from _iter_collection(coll, mongo_url, jd_skills, batch_size, plan)
+
+
+def _iter_collection(coll, mongo_url: str, jd_skills: List[str], batch_size: int, plan: QueryPlan) -> Iterator[dict]:
+    if plan is not None:
+        ensure_candidate_indexes(coll, mongo_url)
+        cursor = coll.find(plan.query, SCORING_PROJECTION, batch_size=batch_size, collation=plan.collation)
+        if plan.sort:
+            cursor = cursor.sort(plan.sort)
+        if plan.limit:
+            cursor = cursor.limit(plan.limit)
+    else:
+        query={}
+        if jd_skills:
+            query["resume_json.skills"]={"$in":jd_skills}
+        cursor = coll.find(query, SCORING_PROJECTION, batch_size=batch_size)
+
+    try:
+        for doc in cursor:
+            validated = _validate_resume(doc)
+            if validated is not None:
+                yield validated
+    finally:
+        cursor.close()
+
+
+async def aiter_resumes(mongo_url: str, db_name: str, collection: str, jd_skills: List[str]=None, *, batch_size: int = FETCH_BATCH_SIZE, plan: QueryPlan = None) -> AsyncIterator[dict]:
+    """
+    Async wrapper over iter_resumes: each batch is pulled in a worker thread so
+    the event loop keeps scoring earlier documents meanwhile.
+    """
+    it = iter_resumes(mongo_url, db_name, collection, jd_skills, batch_size=batch_size, plan=plan)
+
+    def next_batch():
+        return list(islice(it, batch_size))
+
+    try:
+        while True:
+            batch = await asyncio.to_thread(next_batch)
+            if not batch:
+                break
+            for doc in batch:
+                yield doc
+    finally:
         try:
-            validated = ResumeDBSchema(**clean_doc)
-            validated_resumes.append(validated.model_dump())
-        except Exception as e:
-            print("❌ Invalid resume skipped:", e)
-            continue
+            await asyncio.to_thread(it.close)
+        except ValueError:
+            pass  # cancelled while a batch was still being read; the thread finishes on its own
+
+
+def fetch_resumes(mongo_url: str, db_name: str, collection: str,jd_skills: List[str]=None, *, plan: QueryPlan = None):
+    validated_resumes = list(iter_resumes(mongo_url, db_name, collection, jd_skills, plan=plan))
+    if not validated_resumes:
+        raise ValueError("No resumes found in database.")
 
     return validated_resumes
 
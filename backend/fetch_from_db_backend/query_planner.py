@@ -0,0 +1,158 @@
+# query_planner.py
+import re
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collation import Collation
+
+from backend.shared.utils import total_experience_from_resume
+
+# Case-insensitive comparisons ("python" == "Python") that can still use an index
+# built with the same collation
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+# (uri digest, database, collection) whose candidate indexes were already ensured by this process
+_INDEXED_COLLECTIONS = set()
+_INDEX_LOCK = threading.Lock()
+
+
+def normalize_skills(skills) -> List[str]:
+    """'Python, SQL' or ['Python', ' sql ', 'python'] → ['Python', 'sql'] (case-insensitive dedupe)."""
+    if isinstance(skills, str):
+        skills = re.split(r"[,;/\n]", skills)
+    if not isinstance(skills, list):
+        return []
+
+    seen = set()
+    tokens = []
+    for skill in skills:
+        token = str(skill).strip()
+        if token and token.lower() not in seen:
+            seen.add(token.lower())
+            tokens.append(token)
+    return tokens
+
+
+def parse_min_experience(experience) -> Optional[float]:
+    """'2-4 years' → 2.0, '3+ yrs' → 3.0, 'Fresher' → None."""
+    if isinstance(experience, (int, float)):
+        return float(experience)
+    if not isinstance(experience, str):
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)", experience)
+    return float(match.group(1)) if match else None
+
+
+def build_search_fields(resume_json: dict) -> dict:
+    """
+    Normalized, indexable copy of the fields the planner filters on that
+    resume_json can't serve from an index (skills can: planner_skills_ci).
+    Stored next to resume_json by export_to_mongo.
+    """
+    return {
+        "experience_years": total_experience_from_resume(resume_json.get("experience", [])),
+        "location": (resume_json.get("location") or "").strip().lower(),
+    }
+
+
+class QueryPlan:
+    """Mongo filter + options that pre-select plausible candidates before any LLM work."""
+
+    def __init__(self, query: Dict[str, Any], *, limit: int = None, sort=None, summary: Dict[str, Any] = None):
+        self.query = query
+        self.limit = limit
+        self.sort = sort
+        self.collation = CASE_INSENSITIVE
+        self.summary = summary or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"filters": self.summary, "limit": self.limit}
+
+
+def plan_candidate_query(jd_json: dict = None, filters: dict = None) -> QueryPlan:
+    """
+    Turn a JD (+ optional recruiter filters) into a pushdown query.
+
+    filters:
+        min_experience_years  -> overrides the minimum parsed from jd_json["experience"]
+        use_jd_experience     -> False to ignore the JD's experience requirement (default True)
+        location              -> case-insensitive prefix match on resume location ("new" → "New York")
+        uploaded_within_days  -> only resumes uploaded in the last N days
+        limit                 -> cap on candidates (most recent first)
+    """
+    jd_json = jd_json or {}
+    filters = filters or {}
+    clauses = []
+    summary = {}
+
+    skills = normalize_skills(jd_json.get("skills", []))
+    if skills:
+        # collation makes this case-insensitive and index backed
+        clauses.append({"resume_json.skills": {"$in": skills}})
+        summary["skills"] = skills
+
+    min_exp = filters.get("min_experience_years")
+    if min_exp is None and filters.get("use_jd_experience", True):
+        min_exp = parse_min_experience(jd_json.get("experience"))
+    if min_exp:
+        # documents exported before search fields existed are kept, not dropped
+        clauses.append({"$or": [
+            {"search.experience_years": {"$gte": float(min_exp)}},
+            {"search.experience_years": {"$exists": False}},
+        ]})
+        summary["min_experience_years"] = float(min_exp)
+
+    location = (filters.get("location") or "").strip()
+    if location:
+        prefix = location.lower()
+        clauses.append({"$or": [
+            # range instead of an anchored regex: $regex ignores the collation and its index;
+            # U+FFFF sorts after every character, so this is "starts with"
+            {"search.location": {"$gte": prefix, "$lt": prefix + "\uffff"}},
+            # documents exported before search fields existed
+            {"search.location": {"$exists": False}, "resume_json.location": {"$regex": "^" + re.escape(location), "$options": "i"}},
+        ]})
+        summary["location"] = location
+
+    days = filters.get("uploaded_within_days")
+    if days:
+        since = (datetime.now(timezone.utc) - timedelta(days=int(days))).strftime("%Y-%m-%d %H:%M:%S")
+        # uploaded_at is stored as "%Y-%m-%d %H:%M:%S", so string order is time order
+        clauses.append({"resume_json.uploaded_at": {"$gte": since}})
+        summary["uploaded_since"] = since
+
+    query = {} if not clauses else clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    limit = int(filters["limit"]) if filters.get("limit") else None
+    sort = [("resume_json.uploaded_at", DESCENDING)] if limit else None
+    return QueryPlan(query, limit=limit, sort=sort, summary=summary)
+
+
+def ensure_candidate_indexes(coll, mongo_url: str) -> None:
+    """Create the indexes the planner relies on, once per collection (per cluster) per process."""
+    key = (hashlib.sha256(mongo_url.encode("utf-8")).hexdigest(), coll.database.name, coll.name)
+    with _INDEX_LOCK:
+        if key in _INDEXED_COLLECTIONS:
+            return
+    try:
+        coll.create_index([("resume_json.skills", ASCENDING)], collation=CASE_INSENSITIVE, name="planner_skills_ci")
+        coll.create_index([("search.experience_years", ASCENDING)], name="planner_experience")
+        coll.create_index([("search.location", ASCENDING)], collation=CASE_INSENSITIVE, name="planner_location_ci")
+        coll.create_index([("resume_json.uploaded_at", DESCENDING)], collation=CASE_INSENSITIVE, name="planner_uploaded_at")
+    except Exception as e:
+        # read-only users can still query, just without the indexes
+        print(f"⚠️ Could not create candidate indexes on {key[1:]}: {e}")
+        return
+    with _INDEX_LOCK:
+        _INDEXED_COLLECTIONS.add(key)
+
+
+def count_candidates(coll, plan: QueryPlan) -> int:
+    """How many documents the plan selects (respecting its limit) — before any LLM call."""
+    kwargs = {"collation": plan.collation}
+    if plan.limit:
+        kwargs["limit"] = plan.limit
+    return coll.count_documents(plan.query, **kwargs)
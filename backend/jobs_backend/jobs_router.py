@@ -0,0 +1,204 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, Body, Header, HTTPException, Query, status
+from backend.fetch_from_db_backend.db_fetcher import fetch_resumes, iter_resumes
+from backend.fetch_from_db_backend.query_planner import plan_candidate_query
+from backend.shared.auth import get_user_from_token
+from backend.shared.jobs import job_scheduler, job_store
+from backend.shared.llm import parse_score_batch_size
+from backend.shared.prerank import parse_prerank_top_k, prerank_stream
+from backend.shared.pipeline import INCREMENTAL_EVALUATION, reuse_evaluation, run_pipeline_async, run_pipeline_db_async, score_documents_batched
+
+router = APIRouter()
+
+
+def _get_user(authorization: str):
+    if not authorization:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Authorization header")
+    token = authorization.split(" ")[-1]
+    user = get_user_from_token(token)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    return user
+
+
+def _get_owned_job(job_id: str, user: dict) -> dict:
+    job = job_store.get_job(job_id)
+    if not job or job.get("username") != user.get("username"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _batch_scorer(jd_json, weights, batch_size, api_key, model, incremental=False):
+    if not jd_json or batch_size <= 1:
+        return None
+
+    async def finalize(documents):
+        await score_documents_batched(
+            documents, jd_json, weights, batch_size=batch_size, api_key=api_key, model=model, incremental=incremental
+        )
+
+    return finalize
+
+
+# --------------------------
+# 1️⃣ Submit: uploaded files
+# --------------------------
+@router.post("/evaluate_resumes")
+async def submit_evaluate_resumes(
+    uploaded_paths: List[str] = Body(..., description="List of uploaded resume file paths"),
+    jd_data: dict = Body(None, description="Contains jd_json + weights"),
+    concurrency: int = Body(None, description="Max resumes evaluated in parallel for this job"),
+    authorization: str = Header(None),
+    x_model: str = Header(None),
+    x_api_key: str = Header(None)
+):
+    user = _get_user(authorization)
+
+    model = x_model or "gemini-2.5-flash"
+    api_key = x_api_key
+    jd_json = jd_data.get("jd_json") if jd_data else None
+    weights = jd_data.get("weights") if jd_data else None
+    try:
+        batch_size = parse_score_batch_size((jd_data or {}).get("score_batch_size"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finalize = _batch_scorer(jd_json, weights, batch_size, api_key, model)
+
+    job_id = job_store.create_job(
+        "evaluate_resumes",
+        user.get("username"),
+        {"uploaded_paths": uploaded_paths, "jd_json": jd_json, "weights": weights, "model": model}
+    )
+
+    async def load_items():
+        return list(uploaded_paths)
+
+    async def process(path):
+        return await run_pipeline_async(
+            resume_file_path=path,
+            weights=weights,
+            jd_json=None if finalize else jd_json,
+            username=user.get("username"),
+            api_key=api_key,
+            model=model
+        )
+
+    job_scheduler.submit(job_id, load_items, process, concurrency=concurrency, finalize=finalize)
+    return {"status": "success", "job_id": job_id, "total": len(uploaded_paths)}
+
+
+# --------------------------
+# 2️⃣ Submit: MongoDB collection
+# --------------------------
+@router.post("/evaluate_resumes_db")
+async def submit_evaluate_resumes_db(
+    mongo_url: str = Body(...),
+    db_name: str = Body(...),
+    collection_name: str = Body(...),
+    jd_data: dict = Body(None),
+    concurrency: int = Body(None, description="Max resumes evaluated in parallel for this job"),
+    authorization: str = Header(None),
+    x_model: str = Header(None),
+    x_api_key: str = Header(None),
+):
+    user = _get_user(authorization)
+
+    model = x_model or (jd_data and jd_data.get("model")) or "gemini-2.5-flash"
+    api_key = x_api_key or (jd_data and jd_data.get("api_key"))
+    jd_json = jd_data.get("jd_json") if jd_data else None
+    weights = jd_data.get("weights") if jd_data else None
+    try:
+        batch_size = parse_score_batch_size((jd_data or {}).get("score_batch_size"))
+        prerank_top_k = parse_prerank_top_k((jd_data or {}).get("prerank_top_k"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    incremental = bool(jd_json) and bool((jd_data or {}).get("incremental", INCREMENTAL_EVALUATION))
+    finalize = _batch_scorer(jd_json, weights, batch_size, api_key, model, incremental)
+
+    # mongo_url may carry credentials, so it is not persisted with the job
+    job_id = job_store.create_job(
+        "evaluate_resumes_db",
+        user.get("username"),
+        {"db_name": db_name, "collection_name": collection_name, "jd_json": jd_json, "weights": weights, "model": model}
+    )
+
+    plan = plan_candidate_query(jd_json, (jd_data or {}).get("filters"))
+
+    async def load_items():
+        if not (jd_json and prerank_top_k):
+            return await asyncio.to_thread(fetch_resumes, mongo_url, db_name, collection_name, plan=plan)
+        # only the BM25 top-K become job items (each keeps its prerank_score);
+        # the rest of the collection is streamed past, never held in memory
+        documents, _ = await asyncio.to_thread(
+            prerank_stream, lambda: iter_resumes(mongo_url, db_name, collection_name, plan=plan), jd_json, prerank_top_k
+        )
+        if not documents:
+            raise ValueError("No resumes found in database.")
+        return documents
+
+    async def process(doc):
+        # already scored for this JD + model with the same resume: reuse, no LLM call
+        reused = incremental and reuse_evaluation(doc, jd_json, weights, model) == "reused"
+        return await run_pipeline_db_async(
+            doc,
+            weights=weights,
+            jd_json=None if (finalize or reused) else jd_json,
+            username=user.get("username"),
+            api_key=api_key,
+            model=model,
+        )
+
+    def label(doc):
+        return doc.get("resume_json", {}).get("email") or "N/A"
+
+    job_scheduler.submit(job_id, load_items, process, label=label, concurrency=concurrency, finalize=finalize)
+    return {"status": "success", "job_id": job_id}
+
+
+# --------------------------
+# 3️⃣ Progress
+# --------------------------
+@router.get("/{job_id}")
+async def job_status(job_id: str, authorization: str = Header(None)):
+    user = _get_user(authorization)
+    job = _get_owned_job(job_id, user)
+    job.pop("username", None)
+    return {"status": "success", "job": job}
+
+
+# --------------------------
+# 4️⃣ Partial / final results
+# --------------------------
+@router.get("/{job_id}/results")
+async def job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    authorization: str = Header(None)
+):
+    user = _get_user(authorization)
+    job = _get_owned_job(job_id, user)
+    results = job_store.get_results(job_id, offset=offset, limit=limit)
+    return {
+        "status": "success",
+        "job_status": job["status"],
+        "total": job["total"],
+        "done": job["done"],
+        "offset": offset,
+        "count": len(results["data"]),
+        "data": results["data"],
+        "failed": results["failed"],
+    }
+
+
+# --------------------------
+# 5️⃣ Cancel
+# --------------------------
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str, authorization: str = Header(None)):
+    user = _get_user(authorization)
+    job = _get_owned_job(job_id, user)
+    if not job_scheduler.cancel(job_id):
+        return {"status": "error", "message": f"Job is not running (status: {job['status']})"}
+    return {"status": "success", "message": "Cancellation requested"}
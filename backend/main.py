@@ -5,6 +5,10 @@ from backend.upload_files_backend.upload_router import router as upload_router
 from backend.fetch_from_db_backend.fetch_router import router as db_router
 from backend.admin_backend.admin_router import router as admin_router
 from backend.auth_backend.auth_router import router as auth_router
+from backend.jobs_backend.jobs_router import router as jobs_router
+from backend.results_backend.results_router import router as results_router
+from backend.shared.mongo import mongo_registry
+from backend.shared.genai_clients import genai_clients
 
 app = FastAPI(title="Unified Resume Scanner API")
 
@@ -20,6 +24,16 @@ app.include_router(upload_router)
 app.include_router(db_router, prefix="/db")
 app.include_router(admin_router, prefix="/admin")
 app.include_router(auth_router,prefix="/auth")
+app.include_router(jobs_router, prefix="/jobs")
+app.include_router(results_router, prefix="/results")
+
+@app.on_event("shutdown")
+def close_mongo_clients():
+    mongo_registry.close_all()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await genai_clients.aclose_all()
 
 @app.get("/")
 def root():
@@ -0,0 +1,111 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, Body, Header, HTTPException, Query, status
+from backend.shared.auth import get_user_from_token
+from backend.shared.ranking import rerank_documents
+from backend.shared.results import RESULTS_MAX_PAGE_SIZE, SORT_COLUMNS, result_store
+
+router = APIRouter()
+
+
+def _get_user(authorization: str):
+    if not authorization:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Authorization header")
+    token = authorization.split(" ")[-1]
+    user = get_user_from_token(token)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    return user
+
+
+def _get_owned_set(result_id: str, user: dict) -> dict:
+    result_set = result_store.get_set(result_id)
+    if not result_set or result_set.get("username") != user.get("username"):
+        raise HTTPException(status_code=404, detail="Result set not found")
+    return result_set
+
+
+# --------------------------
+# 1️⃣ Store a finished evaluation set
+# --------------------------
+@router.post("")
+async def save_results(
+    documents: List[dict] = Body(..., description="Evaluated documents (resume_json + evaluations)"),
+    meta: dict = Body(None, description="Anything to keep with the set, e.g. jd title / weights"),
+    authorization: str = Header(None)
+):
+    user = _get_user(authorization)
+    result_id = await asyncio.to_thread(result_store.save, user.get("username"), documents, meta)
+    return {"status": "success", "result_id": result_id, "total": len(documents)}
+
+
+# --------------------------
+# 2️⃣ One sorted / filtered page
+# --------------------------
+@router.get("/{result_id}")
+async def get_results_page(
+    result_id: str,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=RESULTS_MAX_PAGE_SIZE),
+    sort: str = Query("score", description=f"One of: {', '.join(SORT_COLUMNS)}"),
+    order: str = Query("desc", description="'asc' or 'desc'"),
+    min_score: float = Query(None),
+    matched_skill: str = Query(None),
+    missing_skill: str = Query(None),
+    location: str = Query(None, description="Case-insensitive substring of the candidate location"),
+    authorization: str = Header(None)
+):
+    user = _get_user(authorization)
+    result_set = _get_owned_set(result_id, user)
+
+    try:
+        result = await asyncio.to_thread(
+            result_store.query,
+            result_id,
+            page=page,
+            limit=limit,
+            sort=sort,
+            descending=order.lower() != "asc",
+            min_score=min_score,
+            matched_skill=matched_skill,
+            missing_skill=missing_skill,
+            location=location,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "success",
+        "result_id": result_id,
+        "set_total": result_set["total"],
+        **result,
+    }
+
+
+# --------------------------
+# 3️⃣ Re-weight a stored set (no LLM)
+# --------------------------
+@router.post("/{result_id}/rescore")
+async def rescore_results(
+    result_id: str,
+    weights: dict = Body(..., embed=True, description="New field weights"),
+    authorization: str = Header(None)
+):
+    user = _get_user(authorization)
+    _get_owned_set(result_id, user)
+
+    documents = await asyncio.to_thread(result_store.all_documents, result_id)
+    ranked = rerank_documents(documents, weights)
+    await asyncio.to_thread(result_store.replace_documents, result_id, ranked)
+    return {"status": "success", "result_id": result_id, "total": len(ranked)}
+
+
+# --------------------------
+# 4️⃣ Drop a stored set
+# --------------------------
+@router.delete("/{result_id}")
+async def delete_results(result_id: str, authorization: str = Header(None)):
+    user = _get_user(authorization)
+    _get_owned_set(result_id, user)
+    await asyncio.to_thread(result_store.delete, result_id)
+    return {"status": "success", "message": "Result set deleted"}
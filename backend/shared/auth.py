@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 
 from passlib.context import CryptContext
 import jwt
-from pymongo import MongoClient
+from backend.shared.mongo import pinned_mongo_client
 from pymongo.errors import DuplicateKeyError
 
 # -----------------------------
@@ -23,7 +23,8 @@ if not MONGO_URL:
 MONGO_DB = "Users_db"
 MONGO_USERS_COLLECTION = "users"
 
-client = MongoClient(MONGO_URL)
+# kept for the life of the process, so the registry must never evict it
+client = pinned_mongo_client(MONGO_URL)
 db = client[MONGO_DB]
 users_collection = db[MONGO_USERS_COLLECTION]
 
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+CACHE_DIR = Path(os.getenv("CACHE_DIR", PROJECT_ROOT / "cache"))
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DB_PATH = CACHE_DIR / "llm_cache.sqlite3"
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def canonical_hash(obj: Any) -> str:
+    """Order-independent hash of a JSON-like object (dict key order does not matter)."""
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hash_bytes(payload.encode("utf-8"))
+
+
+def make_key(*parts) -> str:
+    """Join key parts into one stable string, e.g. make_key(file_hash, model, "v1")."""
+    return "|".join(str(p) for p in parts)
+
+
+class DiskCache:
+    """
+    Small persistent JSON cache backed by SQLite (one table per cache name).
+
+    - Values must be JSON serialisable; every get() returns a fresh copy.
+    - Least recently used entries are evicted once the table grows past max_bytes.
+    - Optional ttl_seconds: entries older than that are treated as misses and dropped.
+    - hits / misses are counted per process and exposed via stats().
+    """
+
+    def __init__(self, name: str, *, max_bytes: int, ttl_seconds: float = None, db_path: Path = CACHE_DB_PATH):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"""CREATE TABLE IF NOT EXISTS "{name}" (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}_last_access" ON "{name}" (last_access)')
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(f'SELECT value, created_at FROM "{self.name}" WHERE key = ?', (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f'UPDATE "{self.name}" SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, default=str)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO "{self.name}" (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, payload, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self.ttl_seconds:
+            self._conn.execute(f'DELETE FROM "{self.name}" WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+
+        # Drop least recently used rows until we are back under the size budget
+        total = self._conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM "{self.name}"').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(f'SELECT key, size FROM "{self.name}" ORDER BY last_access ASC').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f'DELETE FROM "{self.name}"')
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM "{self.name}"'
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# ----------------- Shared cache instances -----------------
+# Parsed resume JSON keyed by (file bytes hash, model, resume prompt version)
+resume_cache = DiskCache("resume_json", max_bytes=int(os.getenv("RESUME_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+# Parsed JD JSON keyed by (normalized JD text hash, model, JD prompt version)
+jd_cache = DiskCache(
+    "jd_json",
+    max_bytes=int(os.getenv("JD_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("JD_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+)
+
+# Raw LLM scoring output (field_scores, summary, skill buckets) keyed by
+# (resume hash, JD hash, model, score prompt version). Weights are NOT part of
+# the key: totals are recomputed in Python on every hit.
+score_cache = DiskCache("score_result", max_bytes=int(os.getenv("SCORE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+
+def all_cache_stats() -> Dict[str, Any]:
+    return {cache.name: cache.stats() for cache in (resume_cache, jd_cache, score_cache)}
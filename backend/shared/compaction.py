@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict, List
+
+# ----------------- Prompt budget -----------------
+# Rough Gemini ratio, also used by the rate limiter's token estimate
+CHARS_PER_TOKEN = 4
+# Upper bound for one LLM prompt; inputs are trimmed to fit (0 = no limit)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+
+# Only these resume fields reach the scoring prompt (no contact details, no bookkeeping)
+RESUME_SCORING_FIELDS = ("location", "skills", "projects", "experience", "education", "certifications")
+EXPERIENCE_SCORING_FIELDS = ("company", "role", "start_date", "end_date", "description")
+
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.I)
+_SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+# lines this close to a page edge are header / footer candidates
+_PAGE_EDGE_LINES = 3
+
+
+def count_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def minify(value: Any) -> str:
+    """JSON without indentation or spaces after separators; non-ASCII kept as is (fewer tokens than \\u escapes)."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _prune(value: Any) -> Any:
+    """Drop None, empty strings, empty lists and empty dicts, recursively."""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        pruned = [_prune(v) for v in value]
+        return [v for v in pruned if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return _SPACES_RE.sub(" ", value).strip()
+    return value
+
+
+# ----------------- JSON payloads -----------------
+def compact_resume_for_scoring(resume_json: dict) -> dict:
+    """
+    The part of a parsed resume that can change a score.
+    Name, contact details, urls, uploaded_at, total_experience_years (sent
+    separately) and per-job duration_years are left out.
+    """
+    resume = {field: resume_json.get(field) for field in RESUME_SCORING_FIELDS}
+    resume["experience"] = [
+        {field: exp.get(field) for field in EXPERIENCE_SCORING_FIELDS}
+        for exp in resume_json.get("experience") or []
+        if isinstance(exp, dict)
+    ]
+    return _prune(resume)
+
+
+def compact_jd(jd_json: dict) -> dict:
+    return _prune(jd_json)
+
+
+def _cap_descriptions(resume: dict, max_chars: int) -> dict:
+    def cap(entry):
+        text = entry.get("description")
+        if isinstance(text, str) and len(text) > max_chars:
+            entry = {**entry, "description": text[:max_chars].rsplit(" ", 1)[0] + " …"}
+        return entry
+
+    return {
+        **resume,
+        "projects": [cap(p) for p in resume.get("projects", [])],
+        "experience": [cap(e) for e in resume.get("experience", [])],
+    }
+
+
+def fit_resume_to_budget(resume: dict, max_tokens: int) -> dict:
+    """
+    Shrink a compact resume until its minified JSON fits `max_tokens`:
+    long descriptions are shortened first, then the last projects are dropped.
+    Skills, experience and education are never dropped.
+    """
+    if max_tokens <= 0 or count_tokens(minify(resume)) <= max_tokens:
+        return resume
+
+    for max_chars in (600, 300, 150):
+        resume = _cap_descriptions(resume, max_chars)
+        if count_tokens(minify(resume)) <= max_tokens:
+            return resume
+
+    projects = list(resume.get("projects", []))
+    while projects and count_tokens(minify({**resume, "projects": projects})) > max_tokens:
+        projects.pop()
+    return {**resume, "projects": projects} if projects else {k: v for k, v in resume.items() if k != "projects"}
+
+
+# ----------------- Extracted text -----------------
+def _at_page_edge(pos: int, count: int) -> bool:
+    return pos < _PAGE_EDGE_LINES or pos >= count - _PAGE_EDGE_LINES
+
+
+def _repeated_page_edges(pages: List[List[str]]) -> set:
+    """Lines found near the top / bottom of at least half of the pages (running headers / footers)."""
+    seen = Counter()
+    for lines in pages:
+        seen.update(set(lines[:_PAGE_EDGE_LINES] + lines[-_PAGE_EDGE_LINES:]))
+    needed = max(2, (len(pages) + 1) // 2)
+    return {line for line, count in seen.items() if count >= needed}
+
+
+def _edge_run(lines: List[str], edges: set) -> int:
+    """How many of the first (up to _PAGE_EDGE_LINES) lines are running headers / footers, without a gap."""
+    run = 0
+    while run < min(_PAGE_EDGE_LINES, len(lines)) and lines[run] in edges:
+        run += 1
+    return run
+
+
+def _drop_page_numbers(lines: List[str]) -> List[str]:
+    """Page-number lines ("3", "Page 2 of 5", "4/10") near the top / bottom of a page; the same line mid-page is content."""
+    return [
+        line for pos, line in enumerate(lines)
+        if not (_PAGE_NUMBER_RE.match(line) and _at_page_edge(pos, len(lines)))
+    ]
+
+
+def compact_text(text: str) -> str:
+    """
+    Extracted resume / JD text with the token waste removed:
+    - runs of spaces, tabs and blank lines collapsed
+    - page numbers at a page edge dropped, running headers / footers kept once
+      from the top / bottom of each page only (pages are separated by form
+      feeds, see parser._extract_pdf_pages)
+    - a line repeated right after itself kept once
+    """
+    pages = [
+        [_SPACES_RE.sub(" ", line).strip() for line in page.splitlines()]
+        for page in text.split("\f")
+    ]
+    pages = [_drop_page_numbers([line for line in lines if line]) for lines in pages]
+    edges = _repeated_page_edges(pages) if len(pages) > 1 else set()
+
+    kept: List[str] = []
+    emitted_edges = set()
+    for lines in pages:
+        # only the unbroken block of repeated lines at the top / bottom of a page
+        # is header / footer; the same text in the page body ("ACME Corp" in a
+        # job entry) is content
+        head = _edge_run(lines, edges)
+        tail = len(lines) - _edge_run(lines[::-1], edges)
+        for pos, line in enumerate(lines):
+            if pos < head or pos >= max(head, tail):
+                if line in emitted_edges:
+                    continue
+                emitted_edges.add(line)
+            if kept and kept[-1] == line:
+                continue
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut `text` at a line boundary so it fits `max_tokens` (0 = no limit)."""
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    return cut.rsplit("\n", 1)[0] if "\n" in cut else cut
+
+
+# ----------------- Stats -----------------
+class PromptStats:
+    """Before / after token totals per prompt kind, for /admin/llm-usage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, before: int, after: int, trimmed: bool = False) -> None:
+        with self._lock:
+            entry = self._kinds.setdefault(kind, {"prompts": 0, "tokens_before": 0, "tokens_after": 0, "trimmed": 0})
+            entry["prompts"] += 1
+            entry["tokens_before"] += before
+            entry["tokens_after"] += after
+            entry["trimmed"] += int(trimmed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = {kind: dict(entry) for kind, entry in self._kinds.items()}
+        for entry in kinds.values():
+            before = entry["tokens_before"]
+            entry["saved_ratio"] = round(1 - entry["tokens_after"] / before, 3) if before else 0.0
+        return {"token_budget": PROMPT_TOKEN_BUDGET, "kinds": kinds}
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,8 @@
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Server-side state (job queue, stored result sets), one SQLite file per store
+DATA_DIR = Path(os.getenv("DATA_DIR", PROJECT_ROOT / "data"))
+DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,133 @@
+import os
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List
+
+# ----------------- Concurrency limits -----------------
+# Per-request: how many files one /evaluate_resumes call may process at once.
+# Global: how many evaluations the whole process runs at once (shared by all users).
+DEFAULT_REQUEST_CONCURRENCY = int(os.getenv("EVAL_REQUEST_CONCURRENCY", "8"))
+GLOBAL_CONCURRENCY = int(os.getenv("EVAL_GLOBAL_CONCURRENCY", "32"))
+
+_GLOBAL_SEMAPHORE = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+
+
+def resolve_concurrency(requested: int = None) -> int:
+    """
+    Clamp a client supplied concurrency to [1, GLOBAL_CONCURRENCY].
+    Falls back to DEFAULT_REQUEST_CONCURRENCY when nothing (or garbage) is sent.
+    """
+    try:
+        value = int(requested) if requested else DEFAULT_REQUEST_CONCURRENCY
+    except (TypeError, ValueError):
+        value = DEFAULT_REQUEST_CONCURRENCY
+    return max(1, min(value, GLOBAL_CONCURRENCY))
+
+
+def _item_label(item: Any) -> str:
+    """Short identifier for logs: a file name or the candidate's email, never the whole document (PII, full text)."""
+    if isinstance(item, str):
+        return os.path.basename(item)
+    if isinstance(item, dict):
+        email = (item.get("resume_json") or {}).get("email")
+        return email or "document without email"
+    return type(item).__name__
+
+
+async def _guarded(worker: Callable[[Any], Awaitable[Any]], item: Any) -> Dict[str, Any]:
+    """Run one item under the global limit and turn exceptions into an outcome."""
+    async with _GLOBAL_SEMAPHORE:
+        try:
+            return {"item": item, "ok": True, "result": await worker(item)}
+        except Exception as e:
+            print(f"⚠️ Failed to process {_item_label(item)}: {e}")
+            return {"item": item, "ok": False, "error": str(e)}
+
+
+def _bounded_runner(worker: Callable[[Any], Awaitable[Any]], concurrency: int = None):
+    """Wrap `worker` so it respects the per-call and global limits and never raises."""
+    request_semaphore = asyncio.Semaphore(resolve_concurrency(concurrency))
+
+    async def _run_one(item):
+        async with request_semaphore:
+            return await _guarded(worker, item)
+
+    return _run_one
+
+
+async def evaluate_concurrently(
+    items: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    *,
+    concurrency: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Run `worker(item)` for every item with at most `concurrency` in flight for
+    this call and at most GLOBAL_CONCURRENCY across the process.
+
+    Returns one outcome per item, in input order:
+        {"item": item, "ok": True, "result": ...}
+        {"item": item, "ok": False, "error": "message"}
+    A failing item never cancels the others.
+    """
+    run_one = _bounded_runner(worker, concurrency)
+    return await asyncio.gather(*(run_one(item) for item in items))
+
+
+async def evaluate_stream(
+    items: AsyncIterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    *,
+    concurrency: int = None
+) -> List[Dict[str, Any]]:
+    """
+    evaluate_concurrently for an async source (e.g. a DB cursor): work starts
+    on the first items while later ones are still being fetched. The next
+    item is only pulled once a slot is free, so at most `concurrency` items
+    are held unprocessed. Outcomes come back in source order.
+    """
+    slots = asyncio.Semaphore(resolve_concurrency(concurrency))
+
+    async def _run_one(item):
+        try:
+            return await _guarded(worker, item)
+        finally:
+            slots.release()
+
+    tasks = []
+    try:
+        async for item in items:
+            await slots.acquire()
+            tasks.append(asyncio.create_task(_run_one(item)))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return await asyncio.gather(*tasks)
+
+
+async def iter_completed(
+    items: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    *,
+    concurrency: int = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Same limits and outcome shape as evaluate_concurrently, but yields each
+    outcome (plus its input "index") as soon as it finishes.
+    Closing the generator early cancels the work that has not finished yet.
+    """
+    run_one = _bounded_runner(worker, concurrency)
+
+    async def _indexed(idx, item):
+        outcome = await run_one(item)
+        outcome["index"] = idx
+        return outcome
+
+    tasks = [asyncio.create_task(_indexed(idx, item)) for idx, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
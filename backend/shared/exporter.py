@@ -1,17 +1,25 @@
 import os
-import pandas as pd
 from typing import List, Dict
 from datetime import datetime
 import glob
+import hashlib
+import threading
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment
-from pymongo import MongoClient
+from openpyxl.utils import get_column_letter
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.fetch_from_db_backend.query_planner import build_search_fields
+from backend.shared.mongo import mongo_client
+from backend.shared.xlsx_append import XlsxSpliceError, add_sheet, append_rows
 from datetime import datetime
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 EXPORTS_DIR = PROJECT_ROOT / "exports"
 EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 def get_new_excel_name(base_name="resumes", ext=".xlsx", base_dir: str = None):
     """
@@ -162,67 +170,144 @@ def format_certifications_list(certifications: List[str]) -> str:
 #                 max_len = max(max_len, max(len(str(line)) for line in str(cell.value).split("\n")))
 #         ws.column_dimensions[col_letter].width = min(max_len + 5, 50)
 
+EXCEL_HEADERS = [
+    "Name", "Email", "Phone", "Location", "URLs", "Skills",
+    "Education", "Experience", "Projects", "Certifications",
+    "Total Experience Years",
+    "Matched Skills", "Missing Skills", "Other Skills",
+    "Score", "Remarks", "Uploaded At"
+]
+MAX_COLUMN_WIDTH = 50
+
+# Shared style objects (one entry each in the workbook style table)
+HEADER_FONT = Font(bold=True)
+CELL_ALIGNMENT = Alignment(wrap_text=True, vertical="top")
+
+
+def resume_to_row(doc: Dict) -> list:
+    """One export row (in EXCEL_HEADERS order) for an evaluated document."""
+    resume=doc.get("resume_json",{})
+    # Get latest evaluation from evaluations list if exists
+    evaluations = doc.get("evaluations", [])
+    latest_eval = evaluations[-1] if evaluations else {}
+
+    return [
+        resume.get("name", ""),
+        resume.get("email", ""),
+        resume.get("phone", ""),
+        resume.get("location", ""),
+        multiline("; ".join(resume.get("urls", []))) if isinstance(resume.get("urls"), list) else resume.get("urls", ""),
+        multiline(", ".join(resume.get("skills", []))) if isinstance(resume.get("skills"), list) else resume.get("skills", ""),
+        format_education_list(resume.get("education", [])) if isinstance(resume.get("education"), list) else resume.get("education", ""),
+        format_experience_list(resume.get("experience", [])) if isinstance(resume.get("experience"), list) else resume.get("experience", ""),
+        format_projects_list(resume.get("projects", [])) if isinstance(resume.get("projects"), list) else resume.get("projects", ""),
+        format_certifications_list(resume.get("certifications", [])) if isinstance(resume.get("certifications"), list) else resume.get("certifications", ""),
+        resume.get("total_experience_years", 0),
+
+        multiline(", ".join(latest_eval.get("matched_skills", []))),
+        multiline(", ".join(latest_eval.get("missing_skills", []))),
+        multiline(", ".join(latest_eval.get("other_skills", []))),
+
+        latest_eval.get("score", ""),
+
+        "\n".join(
+            f"{idx}) {overall_summary}"
+            for idx, overall_summary in enumerate(latest_eval.get("overall_summary", []), start=1)
+        ) if isinstance(latest_eval.get("overall_summary"), list) else latest_eval.get("overall_summary", ""),
+
+        resume.get("uploaded_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    ]
+
+
+def _display_width(value) -> int:
+    """Longest line of a cell value, in characters."""
+    if value is None or value == "":
+        return 0
+    return max(len(line) for line in str(value).split("\n"))
+
+
+def update_column_widths(widths: List[int], row: list) -> None:
+    """Running max of the display width per column."""
+    for col, value in enumerate(row):
+        width = _display_width(value)
+        if width > widths[col]:
+            widths[col] = width
+
+
+def column_width(max_len: int) -> int:
+    return min(max_len + 5, MAX_COLUMN_WIDTH)
+
+
+def styled_cell(ws, value, font: Font = None) -> WriteOnlyCell:
+    """Write-only cell with the export alignment (and font, for headers)."""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.alignment = CELL_ALIGNMENT
+    if font is not None:
+        cell.font = font
+    return cell
+
+
+def _rows_with_widths(documents: List[Dict], header: List[str] = None):
+    """Export rows for documents plus the column widths they need."""
+    widths = [0] * len(EXCEL_HEADERS)
+    if header:
+        update_column_widths(widths, header)
+    rows = []
+    for doc in documents:
+        row = resume_to_row(doc)
+        update_column_widths(widths, row)
+        rows.append(row)
+    return rows, [column_width(w) for w in widths]
+
+
+def write_resumes_streaming(file_path: str, documents: List[Dict], sheet_name: str = None) -> int:
+    """
+    Write a new workbook in openpyxl write-only mode: rows are streamed to
+    disk instead of being kept as cell objects. Returns the number of data
+    rows written.
+
+    Write-only sheets need column widths before the first row, so every row
+    is built once up front together with the widths, then written.
+    """
+    rows, widths = _rows_with_widths(documents, EXCEL_HEADERS)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name or "Sheet1")
+    for col, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.freeze_panes = "A2"
+
+    ws.append([styled_cell(ws, value, HEADER_FONT) for value in EXCEL_HEADERS])
+    for row in rows:
+        ws.append([styled_cell(ws, value) for value in row])
+
+    wb.save(file_path)
+    return len(rows)
+
+
 def write_resumes_to_sheet(ws, documents: List[Dict], is_new_sheet=False):
     start_row = ws.max_row + 1 if not is_new_sheet else 1
 
+    widths = [0] * len(EXCEL_HEADERS)
     if is_new_sheet:
-        headers = [
-            "Name", "Email", "Phone", "Location", "URLs", "Skills",
-            "Education", "Experience", "Projects", "Certifications",
-            "Total Experience Years",
-            "Matched Skills", "Missing Skills", "Other Skills",
-            "Score", "Remarks", "Uploaded At"
-        ]
-
-        ws.append(headers)
-        for col in range(1, len(headers) + 1):
-            ws.cell(row=1, column=col).font = Font(bold=True)
+        ws.append(EXCEL_HEADERS)
+        for col in range(1, len(EXCEL_HEADERS) + 1):
+            ws.cell(row=1, column=col).font = HEADER_FONT
         ws.freeze_panes = "A2"
-        start_row = 2
+        update_column_widths(widths, EXCEL_HEADERS)
 
     for doc in documents:
-        resume=doc.get("resume_json",{})
-        # Get latest evaluation from evaluations list if exists
-        evaluations = doc.get("evaluations", [])
-        latest_eval = evaluations[-1] if evaluations else {}
-
-        row = [
-            resume.get("name", ""),
-            resume.get("email", ""),
-            resume.get("phone", ""),
-            resume.get("location", ""),
-            multiline("; ".join(resume.get("urls", []))) if isinstance(resume.get("urls"), list) else resume.get("urls", ""),
-            multiline(", ".join(resume.get("skills", []))) if isinstance(resume.get("skills"), list) else resume.get("skills", ""),
-            format_education_list(resume.get("education", [])) if isinstance(resume.get("education"), list) else resume.get("education", ""),
-            format_experience_list(resume.get("experience", [])) if isinstance(resume.get("experience"), list) else resume.get("experience", ""),
-            format_projects_list(resume.get("projects", [])) if isinstance(resume.get("projects"), list) else resume.get("projects", ""),
-            format_certifications_list(resume.get("certifications", [])) if isinstance(resume.get("certifications"), list) else resume.get("certifications", ""),
-            resume.get("total_experience_years", 0),
-
-            multiline(", ".join(latest_eval.get("matched_skills", []))),
-            multiline(", ".join(latest_eval.get("missing_skills", []))),
-            multiline(", ".join(latest_eval.get("other_skills", []))),
-
-            latest_eval.get("score", ""),
-
-            "\n".join(
-                f"{idx}) {overall_summary}"
-                for idx, overall_summary in enumerate(latest_eval.get("overall_summary", []), start=1)
-            ) if isinstance(latest_eval.get("overall_summary"), list) else latest_eval.get("overall_summary", ""),
-
-            resume.get("uploaded_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-        ]
+        row = resume_to_row(doc)
+        update_column_widths(widths, row)
         ws.append(row)
 
-    # Adjust column widths
-    for col in ws.columns:
-        max_len = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            cell.alignment = Alignment(wrap_text=True, vertical="top")
-            if cell.value:
-                max_len = max(max_len, max(len(str(line)) for line in str(cell.value).split("\n")))
-        ws.column_dimensions[col_letter].width = min(max_len + 5, 50)
+    # ✅ Style only the rows written now; existing widths only ever grow
+    for row_cells in ws.iter_rows(min_row=start_row, max_col=len(EXCEL_HEADERS)):
+        for cell in row_cells:
+            cell.alignment = CELL_ALIGNMENT
+    for col, max_len in enumerate(widths, start=1):
+        dim = ws.column_dimensions[get_column_letter(col)]
+        dim.width = max(dim.width or 0, column_width(max_len))
 
 
 def export_to_excel(
@@ -231,7 +316,8 @@ def export_to_excel(
     file_path: str = None,
     sheet_name: str = None,
     base_dir: str = None
-) -> pd.DataFrame:
+) -> str:
+    """Write documents to an Excel export and return the file path."""
     # Ensure file is in exports folder
     if base_dir is None:
         base_dir = EXPORTS_DIR
@@ -242,15 +328,22 @@ def export_to_excel(
         file_path = get_new_excel_name(base_dir=base_dir)
 
     if mode == "new_file":
-        wb = Workbook()
-        ws = wb.create_sheet(title=sheet_name or "Sheet1")
-        if "Sheet" in wb.sheetnames:
-            del wb["Sheet"]
-        write_resumes_to_sheet(ws, documents, is_new_sheet=True)
+        # ✅ Fresh file: streamed write-only workbook, no DataFrame, no cell walk
+        write_resumes_streaming(file_path, documents, sheet_name)
+        print(f"✅ Exported to {file_path} [{mode}] → sheet: {sheet_name or 'Sheet1'}")
+        return file_path
 
     elif mode == "append_sheet":
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
+        # ✅ Splice only the new rows into that sheet's XML; historical rows are never loaded
+        rows, widths = _rows_with_widths(documents)
+        try:
+            append_rows(file_path, sheet_name, rows, widths)
+            print(f"✅ Exported to {file_path} [{mode}] → sheet: {sheet_name}")
+            return file_path
+        except XlsxSpliceError as e:
+            print(f"⚠️ Fast append not possible ({e}), rewriting workbook with openpyxl")
         wb = load_workbook(file_path)
         if sheet_name not in wb.sheetnames:
             raise ValueError(f"Sheet '{sheet_name}' not found in file.")
@@ -260,6 +353,14 @@ def export_to_excel(
     elif mode == "new_sheet":
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
+        # ✅ Add the sheet as a new part; existing sheets are copied, not re-serialized
+        rows, widths = _rows_with_widths(documents, EXCEL_HEADERS)
+        try:
+            add_sheet(file_path, sheet_name, EXCEL_HEADERS, rows, widths)
+            print(f"✅ Exported to {file_path} [{mode}] → sheet: {sheet_name}")
+            return file_path
+        except XlsxSpliceError as e:
+            print(f"⚠️ Fast new sheet not possible ({e}), rewriting workbook with openpyxl")
         wb = load_workbook(file_path)
         if sheet_name in wb.sheetnames:
             raise ValueError(f"Sheet '{sheet_name}' already exists.")
@@ -272,7 +373,7 @@ def export_to_excel(
     wb.save(file_path)
     print(f"✅ Exported to {file_path} [{mode}] → sheet: {sheet_name or 'Sheet1'}")
 
-    return pd.DataFrame(documents)
+    return file_path
 
 
 
@@ -339,67 +440,165 @@ def export_to_excel(
 #     client.close()
 #     return {"inserted_count": updated_count}
 
-def export_to_mongo(
-    documents,
-    mongo_url,
-    db_name="resume_db",
-    collection_name="resumes"
-):
-    if not mongo_url:
-        raise ValueError("MongoDB URL is required")
+# Documents per bulk_write round-trip
+MONGO_EXPORT_CHUNK_SIZE = int(os.getenv("MONGO_EXPORT_CHUNK_SIZE", "500"))
 
-    client = MongoClient(mongo_url)
-    db = client[db_name]
-    collection = db[collection_name]
+# (uri digest, db, collection) whose unique email index was already ensured by this process
+_INDEXED_COLLECTIONS = set()
+_INDEX_LOCK = threading.Lock()
 
+
+def _ensure_email_index(collection, mongo_url: str) -> None:
+    key = (hashlib.sha256(mongo_url.encode("utf-8")).hexdigest(), collection.database.name, collection.name)
+    with _INDEX_LOCK:
+        if key in _INDEXED_COLLECTIONS:
+            return
     # Unique identity
     collection.create_index("resume_json.email", unique=True)
+    with _INDEX_LOCK:
+        _INDEXED_COLLECTIONS.add(key)
 
-    updated_count = 0
 
-    for doc in documents:
-        resume = doc.get("resume_json", {})
-        evaluations = doc.get("evaluations", [])
-        email = resume.get("email")
-        if not email:
-            continue
+def _build_upsert(doc: Dict):
+    resume = doc.get("resume_json", {})
+    evaluations = doc.get("evaluations", [])
+    email = resume.get("email")
+    if not email:
+        return None, None
 
-        if not evaluations:
-            # Still ensure resume exists in DB
-            result = collection.update_one(
-                {"resume_json.email": email},
-                {
-                    "$set": {
-                        "resume_json": resume
-                    },
-                    "$setOnInsert": {
-                        "evaluations": []
-                    }
-                },
-                upsert=True
-            )
-            if result.upserted_id or result.matched_count:
-                updated_count += 1
-            continue
-
-        # Append evaluations, resume_json only on insert
-        latest_eval=evaluations[-1]
-        result = collection.update_one(
+    if not evaluations:
+        # Still ensure resume exists in DB
+        return email, UpdateOne(
             {"resume_json.email": email},
             {
-                "$setOnInsert": {
-                    "resume_json": resume
+                "$set": {
+                    "resume_json": resume,
+                    "search": build_search_fields(resume)
                 },
-                "$push": {
-                        "evaluations": latest_eval
-                    }
-                
+                "$setOnInsert": {
+                    "evaluations": []
+                }
             },
             upsert=True
         )
 
-        if result.modified_count or result.upserted_id:
-            updated_count += 1
+    latest_eval = evaluations[-1]
+    if latest_eval.get("reused"):
+        return email, _replace_evaluation(email, resume, {k: v for k, v in latest_eval.items() if k != "reused"})
+
+    # Append latest evaluation, resume_json only on insert
+    return email, UpdateOne(
+        {"resume_json.email": email},
+        {
+            "$setOnInsert": {
+                "resume_json": resume,
+                "search": build_search_fields(resume)
+            },
+            "$push": {
+                "evaluations": latest_eval
+            }
+        },
+        upsert=True
+    )
+
+
+def _replace_evaluation(email: str, resume: Dict, evaluation: Dict) -> UpdateOne:
+    """
+    Reused evaluation (same JD, resume and model as a stored one): drop the
+    stored copy and append this one (new weights → new score), so it stays the
+    latest without duplicating it. Pipeline update, so it also works as an
+    upsert into a collection that never saw the candidate. Values are
+    wrapped in $literal since resume text may start with "$".
+    """
+    same = {"$and": [
+        {"$eq": ["$$e.jd_fingerprint", {"$literal": evaluation.get("jd_fingerprint")}]},
+        {"$eq": ["$$e.resume_fingerprint", {"$literal": evaluation.get("resume_fingerprint")}]},
+        {"$eq": ["$$e.model", {"$literal": evaluation.get("model")}]},
+    ]}
+    return UpdateOne(
+        {"resume_json.email": email},
+        [{
+            "$set": {
+                "resume_json": {"$ifNull": ["$resume_json", {"$literal": resume}]},
+                "search": {"$ifNull": ["$search", {"$literal": build_search_fields(resume)}]},
+                "evaluations": {"$concatArrays": [
+                    {"$filter": {"input": {"$ifNull": ["$evaluations", []]}, "as": "e", "cond": {"$not": [same]}}},
+                    [{"$literal": evaluation}],
+                ]},
+            }
+        }],
+        upsert=True
+    )
+
 
-    client.close()
-    return {"inserted_count": updated_count}
+def export_to_mongo(
+    documents,
+    mongo_url,
+    db_name="resume_db",
+    collection_name="resumes",
+    chunk_size: int = MONGO_EXPORT_CHUNK_SIZE
+):
+    """
+    Upsert evaluated documents keyed by resume_json.email using unordered
+    bulk_write batches of `chunk_size` (one round-trip per chunk instead of
+    one per document). A failing document never blocks the rest of its chunk.
+
+    Returns aggregate counts plus per-document errors:
+        {"inserted_count", "updated_count", "upserted_count", "matched_count",
+         "modified_count", "skipped_count", "error_count", "errors": [...]}
+    """
+    if not mongo_url:
+        raise ValueError("MongoDB URL is required")
+
+    # the lease keeps the pooled client open for every chunk
+    with mongo_client(mongo_url) as client:
+        return _export_to_collection(client[db_name][collection_name], documents, mongo_url, chunk_size)
+
+
+def _export_to_collection(collection, documents, mongo_url: str, chunk_size: int):
+    _ensure_email_index(collection, mongo_url)
+
+    emails = []
+    operations = []
+    skipped_count = 0
+    for doc in documents:
+        email, op = _build_upsert(doc)
+        if op is None:
+            skipped_count += 1
+            continue
+        emails.append(email)
+        operations.append(op)
+
+    upserted_count = matched_count = modified_count = 0
+    errors = []
+    chunk_size = max(1, int(chunk_size))
+
+    for start in range(0, len(operations), chunk_size):
+        chunk = operations[start:start + chunk_size]
+        try:
+            result = collection.bulk_write(chunk, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for err in details.get("writeErrors", []):
+                errors.append({"email": emails[start + err["index"]], "message": err.get("errmsg", "write error")})
+
+        upserted_count += details.get("nUpserted", 0)
+        matched_count += details.get("nMatched", 0)
+        modified_count += details.get("nModified", 0)
+
+    # Same meaning as before: documents that were inserted or changed/seen
+    updated_count = len(operations) - len(errors)
+
+    print(f"✅ Mongo export: {upserted_count} inserted, {modified_count} modified, {len(errors)} errors, {skipped_count} skipped")
+
+    return {
+        "inserted_count": updated_count,
+        "updated_count": updated_count,
+        "upserted_count": upserted_count,
+        "matched_count": matched_count,
+        "modified_count": modified_count,
+        "skipped_count": skipped_count,
+        "error_count": len(errors),
+        "errors": errors
+    }
@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List
+
+from google import genai
+
+# ----------------- Registry settings -----------------
+# How many per-key clients we keep warm and for how long
+LLM_MAX_CLIENTS = int(os.getenv("LLM_MAX_CLIENTS", "64"))
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", "900"))
+
+
+class _Entry:
+    def __init__(self, client: genai.Client):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.retired = False
+
+
+def _close_client(client: genai.Client) -> None:
+    """Close both the sync and the aio HTTP pools of a client, best effort."""
+    try:
+        client.close()
+    except Exception as e:
+        print(f"⚠️ Closing LLM client failed: {e}")
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # no loop in this thread: the aio pool is released with the client
+    task = loop.create_task(client.aio.aclose())
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class GenaiClientRegistry:
+    """
+    Process-wide genai.Client cache keyed by a hash of the API key.
+
+    A client owns its HTTP connection pools, so reusing one per key keeps
+    TCP/TLS sessions warm across resumes and requests instead of opening a
+    new connection for every call.
+    - at most LLM_MAX_CLIENTS clients (least recently used is closed first)
+    - clients unused for LLM_CLIENT_IDLE_SECONDS are closed
+    - a client that is evicted while a call is using it is closed only when
+      that call releases it
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def _key(api_key: str) -> str:
+        # never keep raw API keys as dict keys
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def lease(self, api_key: str):
+        """Shared client for `api_key` for the duration of one call. Do NOT close it."""
+        if not api_key:
+            raise ValueError("API key is required")
+
+        key = self._key(api_key)
+        to_close: List[genai.Client] = []
+        with self._lock:
+            to_close += self._evict_idle()
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = _Entry(genai.Client(api_key=api_key))
+                to_close += self._evict_overflow()
+            else:
+                self._clients.move_to_end(key)
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+        for client in to_close:
+            _close_client(client)
+
+        try:
+            yield entry.client
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                close_now = entry.retired and entry.in_use == 0
+            if close_now:
+                _close_client(entry.client)
+
+    def _retire(self, key: str) -> List[genai.Client]:
+        """Remove an entry (lock held); returns its client if it can be closed right away."""
+        entry = self._clients.pop(key)
+        entry.retired = True
+        return [entry.client] if entry.in_use == 0 else []
+
+    def _evict_idle(self) -> List[genai.Client]:
+        now = time.monotonic()
+        closable = []
+        for key in [k for k, e in self._clients.items() if not e.in_use and now - e.last_used > LLM_CLIENT_IDLE_SECONDS]:
+            closable += self._retire(key)
+        return closable
+
+    def _evict_overflow(self) -> List[genai.Client]:
+        closable = []
+        while len(self._clients) > LLM_MAX_CLIENTS:
+            closable += self._retire(next(iter(self._clients)))
+        return closable
+
+    async def aclose_all(self) -> None:
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            try:
+                entry.client.close()
+                await entry.client.aio.aclose()
+            except Exception as e:
+                print(f"⚠️ Closing LLM client failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "in_use": sum(1 for e in self._clients.values() if e.in_use),
+                "max_clients": LLM_MAX_CLIENTS,
+            }
+
+
+genai_clients = GenaiClientRegistry()
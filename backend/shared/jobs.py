@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.shared.config import DATA_DIR
+from backend.shared.evaluator import evaluate_concurrently
+
+JOBS_DB_PATH = DATA_DIR / "jobs.sqlite3"
+
+# How many evaluation jobs may run at the same time (items inside a job are
+# additionally bounded by the evaluator's per-request / global limits)
+MAX_RUNNING_JOBS = int(os.getenv("JOB_MAX_RUNNING", "4"))
+
+# queued → running → completed | failed | cancelled
+# jobs that were queued/running when the server stopped become "interrupted"
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobStore:
+    """
+    SQLite-backed job state so progress and partial results survive a
+    uvicorn restart. API keys are never persisted.
+    """
+
+    def __init__(self, db_path: Path = JOBS_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    username TEXT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    params TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    label TEXT,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    PRIMARY KEY (job_id, idx)
+                )"""
+            )
+            self._conn.commit()
+
+    # ----------------- Jobs -----------------
+    def create_job(self, kind: str, username: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, username, kind, status, params, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, username, kind, json.dumps(params, default=str), now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def update_job(self, job_id: str, **fields) -> None:
+        if not fields:
+            return
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, username, kind, status, total, done, failed, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "username", "kind", "status", "total", "done", "failed", "error", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def mark_interrupted(self) -> int:
+        """Called at startup: anything still active was lost with the previous process."""
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                (time.time(), *ACTIVE_STATUSES)
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+    # ----------------- Items -----------------
+    def add_items(self, job_id: str, labels: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_items (job_id, idx, label, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, idx, label) for idx, label in enumerate(labels)]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET total = ?, updated_at = ? WHERE id = ?",
+                (len(labels), time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def record_item(self, job_id: str, idx: int, *, result: Any = None, error: str = None) -> None:
+        ok = error is None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ? WHERE job_id = ? AND idx = ?",
+                ("done" if ok else "failed", json.dumps(result, default=str) if ok else None, error, job_id, idx)
+            )
+            self._conn.execute(
+                f"UPDATE jobs SET {'done' if ok else 'failed'} = {'done' if ok else 'failed'} + 1, updated_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Finished items (in input order) plus per-item failures seen so far."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, result FROM job_items WHERE job_id = ? AND status = 'done' ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+            failures = self._conn.execute(
+                "SELECT idx, label, error FROM job_items WHERE job_id = ? AND status = 'failed' ORDER BY idx",
+                (job_id,)
+            ).fetchall()
+        return {
+            "data": [json.loads(result) for _, result in rows],
+            "failed": [{"index": idx, "item": label, "error": error} for idx, label, error in failures],
+        }
+
+
+class JobScheduler:
+    """
+    Runs evaluation jobs as background asyncio tasks, at most
+    MAX_RUNNING_JOBS at a time; further jobs wait in "queued".
+    """
+
+    def __init__(self, store: JobStore, max_running: int = MAX_RUNNING_JOBS):
+        self.store = store
+        self._semaphore = asyncio.Semaphore(max_running)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(
+        self,
+        job_id: str,
+        load_items: Callable[[], Awaitable[List[Any]]],
+        worker: Callable[[Any], Awaitable[Any]],
+        *,
+        label: Callable[[Any], str] = str,
+        concurrency: int = None,
+        finalize: Callable[[List[Any]], Awaitable[None]] = None
+    ) -> None:
+        """
+        load_items -> coroutine returning the items to process (runs inside the job)
+        worker     -> coroutine processing one item
+        finalize   -> optional coroutine run over all successful results before completion
+        """
+        task = asyncio.create_task(self._run(job_id, load_items, worker, label, concurrency, finalize))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id, load_items, worker, label, concurrency, finalize):
+        try:
+            async with self._semaphore:
+                self.store.update_job(job_id, status="running")
+                items = await load_items()
+                self.store.add_items(job_id, [label(item) for item in items])
+
+                async def run_item(indexed):
+                    idx, item = indexed
+                    try:
+                        result = await worker(item)
+                    except Exception as e:
+                        self.store.record_item(job_id, idx, error=str(e))
+                        raise
+                    if finalize is None:
+                        self.store.record_item(job_id, idx, result=result)
+                    return result
+
+                outcomes = await evaluate_concurrently(list(enumerate(items)), run_item, concurrency=concurrency)
+
+                if finalize is not None:
+                    # e.g. batched scoring: results are only final after this step
+                    succeeded = [o for o in outcomes if o["ok"]]
+                    await finalize([o["result"] for o in succeeded])
+                    for o in succeeded:
+                        self.store.record_item(job_id, o["item"][0], result=o["result"])
+
+                self.store.update_job(job_id, status="completed")
+        except asyncio.CancelledError:
+            self.store.update_job(job_id, status="cancelled")
+        except Exception as e:
+            print(f"⚠️ Job {job_id} failed: {e}")
+            self.store.update_job(job_id, status="failed", error=str(e))
+
+    def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+
+job_store = JobStore()
+job_store.mark_interrupted()
+job_scheduler = JobScheduler(job_store)
@@ -1,12 +1,79 @@
+import os
+import re
 import json
 from typing import Dict
 from pydantic import ValidationError
 from backend.shared.schema import ResumeSchema,JobDescriptionSchema
-from backend.shared.utils import add_experience_duration_readable, call_llm, compute_total_score
+from backend.shared.evaluator import evaluate_concurrently
+from backend.shared.cache import canonical_hash, hash_bytes, jd_cache, make_key, score_cache
+from backend.shared.compaction import (
+    PROMPT_TOKEN_BUDGET,
+    compact_jd,
+    compact_resume_for_scoring,
+    compact_text,
+    count_tokens,
+    fit_resume_to_budget,
+    minify,
+    prompt_stats,
+    truncate_text,
+)
+from backend.shared.structured import (
+    batch_score_response_schema,
+    repair_score_result,
+    schema_from_model,
+    score_response_schema,
+    validate_partial,
+)
+from backend.shared.utils import add_experience_duration_readable, call_llm, call_llm_async, compute_total_score
+
+# Bump when the resume prompt/schema changes so cached parses are not reused
+RESUME_PROMPT_VERSION = "v2"
+JD_PROMPT_VERSION = "v2"
+SCORE_PROMPT_VERSION = "v2"
+
+# Structured-output schema for the resume parse (duration_years is computed here, not by the LLM)
+RESUME_RESPONSE_SCHEMA = schema_from_model(ResumeSchema, exclude=("duration_years",))
+
+# Resumes packed into one scoring prompt when batching is requested (1 = one prompt per resume)
+DEFAULT_SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "1"))
+
+
+def parse_score_batch_size(value) -> int:
+    """jd_data["score_batch_size"] as a positive int (None / "" = default); ValueError otherwise."""
+    if value in (None, ""):
+        return DEFAULT_SCORE_BATCH_SIZE
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"score_batch_size must be a positive integer, got {value!r}")
+    return value
+
+# ----------------- Prompt compaction -----------------
+def _room_for(template_tokens: int) -> int:
+    """Tokens left for the variable payload of a prompt (0 = no budget)."""
+    if not PROMPT_TOKEN_BUDGET:
+        return 0
+    return max(1, PROMPT_TOKEN_BUDGET - template_tokens)
+
+
+def _compact_text_prompt(kind: str, template, text: str) -> str:
+    """Fill `template` with the compacted, budget-trimmed text; before/after tokens go to prompt_stats."""
+    compact = compact_text(text)
+    fitted = truncate_text(compact, _room_for(count_tokens(template(""))))
+    if fitted != compact:
+        print(f"✂️ {kind} text trimmed to fit PROMPT_TOKEN_BUDGET={PROMPT_TOKEN_BUDGET}")
+    prompt = template(fitted)
+    prompt_stats.record(kind, count_tokens(template(text)), count_tokens(prompt), trimmed=fitted != compact)
+    return prompt
+
 
 # ----------------- Generate Resume JSON -----------------
-def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> Dict:
-    prompt = f"""
+def _build_resume_prompt(text: str) -> str:
+    return _compact_text_prompt("resume", _resume_prompt_template, text)
+
+
+def _resume_prompt_template(text: str) -> str:
+    return f"""
     You are a resume parser. Extract the following fields from the text and return JSON ONLY.
 
     Rules:
@@ -44,9 +111,8 @@ def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini
     {text}
     """
 
-    # Call LLM
-    llm_output = call_llm(prompt, model=model, api_key=api_key)
 
+def _finalize_resume_json(llm_output) -> Dict:
     # ----------------- Handle LLM errors -----------------
     if isinstance(llm_output, dict) and llm_output.get("error"):
         err = llm_output.get("error")
@@ -69,8 +135,9 @@ def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini
         resume = ResumeSchema.model_validate(parsed_json)
         resume_dict = resume.model_dump()
     except ValidationError as e:
-        print(f"⚠️ Validation error: {e}")
-        resume_dict = ResumeSchema().model_dump()  # return empty default schema
+        # ✅ Keep every valid field; only the broken ones fall back to defaults
+        resume_dict, lost = validate_partial(ResumeSchema, parsed_json)
+        print(f"⚠️ Validation error, repaired resume JSON (lost data in: {', '.join(lost) or 'nothing'}): {e.error_count()} issue(s)")
 
     # Add human-readable experience duration
     resume_dict = add_experience_duration_readable(resume_dict)
@@ -78,6 +145,16 @@ def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini
     return resume_dict
 
 
+def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> Dict:
+    llm_output = call_llm(_build_resume_prompt(text), model=model, api_key=api_key, response_schema=RESUME_RESPONSE_SCHEMA)
+    return _finalize_resume_json(llm_output)
+
+
+async def generate_resume_json_async(text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> Dict:
+    llm_output = await call_llm_async(_build_resume_prompt(text), model=model, api_key=api_key, response_schema=RESUME_RESPONSE_SCHEMA)
+    return _finalize_resume_json(llm_output)
+
+
 # # ----------------- Test Runner -----------------
 # if __name__ == "__main__":
 #     import json
@@ -113,8 +190,12 @@ def generate_resume_json(text: str, *, api_key: str = None, model: str = "gemini
 #     print(f"\n----- Total Experience (years) -----\n{total_exp_years:.2f} years")
 
 
-def generate_jd_json(jd_text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> dict:
-    prompt = f"""
+def _build_jd_prompt(jd_text: str) -> str:
+    return _compact_text_prompt("jd", _jd_prompt_template, jd_text)
+
+
+def _jd_prompt_template(jd_text: str) -> str:
+    return f"""
     You are an intelligent JD parser. Extract ALL relevant and meaningful fields from the given job description. 
     Always return a valid JSON object.
 
@@ -138,8 +219,8 @@ def generate_jd_json(jd_text: str, *, api_key: str = None, model: str = "gemini-
     {jd_text}
     """
 
-    llm_result = call_llm(prompt, model=model, api_key=api_key)
 
+def _finalize_jd_json(llm_result) -> dict:
     if isinstance(llm_result, dict) and llm_result.get("error"):
         print(f"JD parsing failed: {llm_result.get('error')}")
         return {}
@@ -160,6 +241,38 @@ def generate_jd_json(jd_text: str, *, api_key: str = None, model: str = "gemini-
 
     return parsed
 
+
+def generate_jd_json(jd_text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> dict:
+    llm_result = call_llm(_build_jd_prompt(jd_text), model=model, api_key=api_key)
+    return _finalize_jd_json(llm_result)
+
+
+async def generate_jd_json_async(jd_text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> dict:
+    llm_result = await call_llm_async(_build_jd_prompt(jd_text), model=model, api_key=api_key)
+    return _finalize_jd_json(llm_result)
+
+
+def _jd_cache_key(jd_text: str, model: str) -> str:
+    # Re-uploads of the same JD often differ only in spacing / line breaks
+    normalized = re.sub(r"\s+", " ", jd_text).strip()
+    return make_key(hash_bytes(normalized.encode("utf-8")), model, JD_PROMPT_VERSION)
+
+
+async def generate_jd_json_cached(jd_text: str, *, api_key: str = None, model: str = "gemini-2.5-flash") -> dict:
+    """
+    generate_jd_json_async behind jd_cache, shared by both /upload_jd routes.
+    Failed parses ({}) are not cached.
+    """
+    cache_key = _jd_cache_key(jd_text, model)
+    cached = jd_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    jd_json = await generate_jd_json_async(jd_text, api_key=api_key, model=model)
+    if jd_json:
+        jd_cache.set(cache_key, jd_json)
+    return jd_json
+
 # # ---- Local Test -------
 # if __name__ == "__main__":
 #     sample_jd = """
@@ -180,35 +293,50 @@ def generate_jd_json(jd_text: str, *, api_key: str = None, model: str = "gemini-
 
 
 
-def generate_score(
+def _build_score_prompt(
     resume_json: dict,
     jd_json: dict,
-    weights: dict,
+    field_list: list,
     resume_experience_float: float,
-    resume_experience_formatted: str,
-    *,
-    api_key: str = None,
-    model: str = "gemini-2.5-flash"
-) -> dict:
-    """
-    Uses LLM ONLY for semantic evaluation.
-    All math (total score) is done in Python to avoid hallucinations.
-    """
-
-    # ---- Extract JD fields dynamically ----
-    field_list = list(jd_json.keys())
-
+    resume_experience_formatted: str
+) -> str:
+    # ---- Minified, scoring-relevant payloads within the prompt budget ----
+    jd_payload = minify(compact_jd(jd_json))
+    fields_payload = minify(field_list)
+
+    def template(resume_payload):
+        return _score_prompt_template(resume_payload, jd_payload, fields_payload, resume_experience_float, resume_experience_formatted)
+
+    compact = compact_resume_for_scoring(resume_json)
+    fitted = fit_resume_to_budget(compact, _room_for(count_tokens(template(""))))
+    prompt = template(minify(fitted))
+
+    verbose = _score_prompt_template(
+        json.dumps(resume_json, indent=2, default=str), json.dumps(jd_json, indent=2),
+        json.dumps(field_list, indent=2), resume_experience_float, resume_experience_formatted
+    )
+    prompt_stats.record("score", count_tokens(verbose), count_tokens(prompt), trimmed=fitted != compact)
+    return prompt
+
+
+def _score_prompt_template(
+    resume_payload: str,
+    jd_payload: str,
+    fields_payload: str,
+    resume_experience_float: float,
+    resume_experience_formatted: str
+) -> str:
     # ---- LLM PROMPT (NO TOTAL, NO WEIGHTS) ----
-    prompt = f"""
+    return f"""
 You are a resume evaluation assistant.
 
 Compare the Resume JSON with the Job Description JSON and return structured evaluation.
 
 Resume JSON:
-{json.dumps(resume_json, indent=2)}
+{resume_payload}
 
 Job Description JSON:
-{json.dumps(jd_json, indent=2)}
+{jd_payload}
 
 Candidate experience:
 - Numeric (for comparison only): {resume_experience_float:.2f} years
@@ -220,7 +348,7 @@ Rules:
 - Use ONLY the provided display experience text
 
 Fields to evaluate:
-{json.dumps(field_list, indent=2)}
+{fields_payload}
 
 Instructions:
 1. For each field, return a score between 0 and 100 (inclusive).
@@ -250,12 +378,37 @@ Return STRICT JSON only in this format:
 }}
 """
 
-    # ---- Call LLM ----
-    result = call_llm(prompt, model=model, api_key=api_key)
 
+def jd_fingerprint(jd_json: dict) -> str:
+    """Identifies a JD as the scoring prompt sees it (and the prompt version)."""
+    return canonical_hash({"jd": compact_jd(jd_json), "prompt": SCORE_PROMPT_VERSION})
+
+
+def resume_fingerprint(resume_json: dict) -> str:
+    # Only what reaches the prompt: a new uploaded_at or email is not a new score
+    return canonical_hash(compact_resume_for_scoring(resume_json))
+
+
+def _score_cache_key(resume_json: dict, jd_json: dict, resume_experience_float: float, model: str) -> str:
+    return make_key(
+        resume_fingerprint(resume_json),
+        canonical_hash(jd_json),
+        f"{resume_experience_float:.2f}",
+        model,
+        SCORE_PROMPT_VERSION
+    )
+
+
+def _cache_score_result(cache_key: str, result) -> None:
+    # Only successful LLM output is worth keeping
+    if isinstance(result, dict) and not result.get("error"):
+        score_cache.set(cache_key, {k: v for k, v in result.items() if k != "total"})
+
+
+def _finalize_score(result, field_list: list, weights: dict) -> dict:
     # ---- Handle LLM error ----
     if not isinstance(result, dict) or result.get("error"):
-        err = result.get("error", {})
+        err = result.get("error", {}) if isinstance(result, dict) else {"message": "no LLM result"}
         return {
             "field_scores": {field: 0.0 for field in field_list},
             "total": 0.0,
@@ -265,12 +418,261 @@ Return STRICT JSON only in this format:
             "other_skills": []
         }
 
+    # ---- Repair instead of zeroing: bad / missing field scores only cost that field ----
+    result, missing = repair_score_result(result, field_list)
+    if missing:
+        print(f"⚠️ LLM gave no usable score for: {', '.join(missing)} (scored 0)")
+
     # ---- SAFE TOTAL SCORE CALCULATION (PYTHON) ----
     field_scores = result.get("field_scores", {})
     result["total"] = compute_total_score(field_scores, weights)
 
     return result
 
+
+def generate_score(
+    resume_json: dict,
+    jd_json: dict,
+    weights: dict,
+    resume_experience_float: float,
+    resume_experience_formatted: str,
+    *,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash"
+) -> dict:
+    """
+    Uses LLM ONLY for semantic evaluation.
+    All math (total score) is done in Python to avoid hallucinations.
+    The LLM output does not depend on weights, so it is cached per
+    (resume, JD, model) and a weight change only re-runs compute_total_score.
+    """
+
+    # ---- Extract JD fields dynamically ----
+    field_list = list(jd_json.keys())
+
+    # ---- Cached LLM output? ----
+    cache_key = _score_cache_key(resume_json, jd_json, resume_experience_float, model)
+    result = score_cache.get(cache_key)
+
+    if result is None:
+        prompt = _build_score_prompt(resume_json, jd_json, field_list, resume_experience_float, resume_experience_formatted)
+
+        # ---- Call LLM ----
+        result = call_llm(prompt, model=model, api_key=api_key, response_schema=score_response_schema(field_list))
+        _cache_score_result(cache_key, result)
+
+    return _finalize_score(result, field_list, weights)
+
+
+async def generate_score_async(
+    resume_json: dict,
+    jd_json: dict,
+    weights: dict,
+    resume_experience_float: float,
+    resume_experience_formatted: str,
+    *,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash"
+) -> dict:
+    """asyncio version of generate_score (same prompt, same Python-side math)."""
+
+    field_list = list(jd_json.keys())
+
+    cache_key = _score_cache_key(resume_json, jd_json, resume_experience_float, model)
+    result = score_cache.get(cache_key)
+
+    if result is None:
+        prompt = _build_score_prompt(resume_json, jd_json, field_list, resume_experience_float, resume_experience_formatted)
+        result = await call_llm_async(prompt, model=model, api_key=api_key, response_schema=score_response_schema(field_list))
+        _cache_score_result(cache_key, result)
+
+    return _finalize_score(result, field_list, weights)
+
+# ----------------- Batched scoring -----------------
+def _build_batch_score_prompt(candidates: list, jd_json: dict, field_list: list) -> str:
+    """
+    One prompt for K resumes against the same JD: the JD and the instructions
+    are sent once instead of K times.
+    candidates: [(resume_json, experience_float, experience_formatted), ...]
+    The prompt budget is shared equally by the candidates of the batch.
+    """
+    jd_payload = minify(compact_jd(jd_json))
+    fields_payload = minify(field_list)
+
+    def blocks(resume_payloads):
+        return "\n\n".join(
+            f"""Candidate {idx}:
+Resume JSON:
+{resume_payload}
+Candidate experience:
+- Numeric (for comparison only): {exp_float:.2f} years
+- Display (use EXACTLY this text in summary): {exp_formatted}"""
+            for idx, (resume_payload, (_, exp_float, exp_formatted)) in enumerate(zip(resume_payloads, candidates))
+        )
+
+    room = _room_for(count_tokens(_batch_score_prompt_template(blocks([""] * len(candidates)), jd_payload, fields_payload)))
+    compact = [compact_resume_for_scoring(resume_json) for resume_json, _, _ in candidates]
+    fitted = [fit_resume_to_budget(resume, max(1, room // len(candidates)) if room else 0) for resume in compact]
+    prompt = _batch_score_prompt_template(blocks([minify(resume) for resume in fitted]), jd_payload, fields_payload)
+
+    verbose = _batch_score_prompt_template(
+        blocks([json.dumps(resume_json, indent=2, default=str) for resume_json, _, _ in candidates]),
+        json.dumps(jd_json, indent=2), json.dumps(field_list, indent=2)
+    )
+    prompt_stats.record("score_batch", count_tokens(verbose), count_tokens(prompt), trimmed=fitted != compact)
+    return prompt
+
+
+def _batch_score_prompt_template(candidate_blocks: str, jd_payload: str, fields_payload: str) -> str:
+    return f"""
+You are a resume evaluation assistant.
+
+Compare EACH candidate's Resume JSON with the Job Description JSON and return a structured evaluation per candidate.
+Evaluate every candidate independently; never compare candidates with each other.
+
+Job Description JSON:
+{jd_payload}
+
+{candidate_blocks}
+
+Rules:
+- Do NOT invent experience formats
+- Do NOT use decimals like 0.33 years
+- Use ONLY the provided display experience text of that candidate
+
+Fields to evaluate:
+{fields_payload}
+
+Instructions:
+1. For each field, return a score between 0 and 100 (inclusive).
+2. Do NOT calculate total score.
+3. Generate "overall_summary" with ONLY:
+   a) Experience comparison with JD (less / equal / more)
+   b) Where candidate does NOT meet JD
+   c) Where candidate DOES meet JD
+4. Keep it factual and neutral.
+   - No hiring decision
+   - No words like "strong fit", "expert", "ideal"
+Note : Overall Summary must be covered in maximum 5 points 
+5. Classify skills into:
+   - matched_skills
+   - missing_skills
+   - other_skills
+
+Return STRICT JSON only in this format, with exactly one entry per candidate:
+{{
+  "results": [
+    {{
+      "candidate": <candidate number>,
+      "field_scores": {{
+         "<field_name>": <float between 0 and 100>
+      }},
+      "overall_summary": ["string"],
+      "matched_skills": ["string"],
+      "missing_skills": ["string"],
+      "other_skills": ["string"]
+    }}
+  ]
+}}
+"""
+
+
+def _split_batch_result(result, count: int) -> list:
+    """
+    Map a batched LLM response back to candidate positions by their
+    "candidate" index. Candidates whose entry is missing, malformed, has an
+    out-of-range index or shares its index with another entry come back as
+    None (and are scored alone).
+    """
+    split = [None] * count
+    if not isinstance(result, dict) or result.get("error"):
+        return split
+
+    entries = result.get("results")
+    if not isinstance(entries, list):
+        return split
+
+    claimed = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("field_scores"), dict):
+            continue
+        idx = entry.pop("candidate", None)
+        if isinstance(idx, str) and idx.isdigit():
+            idx = int(idx)
+        if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < count:
+            continue  # no usable index: the entry can't be attributed to anyone
+        claimed.setdefault(idx, []).append(entry)
+
+    for idx, claims in claimed.items():
+        # two entries for one index: either may be another candidate's scores
+        if len(claims) == 1:
+            split[idx] = claims[0]
+    return split
+
+
+async def generate_scores_batch_async(
+    candidates: list,
+    jd_json: dict,
+    weights: dict,
+    *,
+    batch_size: int = 5,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash"
+) -> list:
+    """
+    Score many resumes against one JD with K resumes per LLM request.
+
+    candidates: [(resume_json, experience_float, experience_formatted), ...]
+    Returns one generate_score-shaped result per candidate, in input order.
+    Cached results are reused; candidates the batched response misses or
+    mangles fall back to a single generate_score_async call.
+    """
+    field_list = list(jd_json.keys())
+    raw_results = [None] * len(candidates)
+    cache_keys = [
+        _score_cache_key(resume_json, jd_json, exp_float, model)
+        for resume_json, exp_float, _ in candidates
+    ]
+
+    pending = []
+    for idx, key in enumerate(cache_keys):
+        cached = score_cache.get(key)
+        if cached is not None:
+            raw_results[idx] = cached
+        else:
+            pending.append(idx)
+
+    batch_size = max(1, int(batch_size or 1))
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    async def score_chunk(chunk):
+        if len(chunk) == 1:
+            idx = chunk[0]
+            resume_json, exp_float, exp_formatted = candidates[idx]
+            prompt = _build_score_prompt(resume_json, jd_json, field_list, exp_float, exp_formatted)
+            result = await call_llm_async(prompt, model=model, api_key=api_key, response_schema=score_response_schema(field_list))
+            _cache_score_result(cache_keys[idx], result)
+            raw_results[idx] = result
+            return
+
+        prompt = _build_batch_score_prompt([candidates[idx] for idx in chunk], jd_json, field_list)
+        result = await call_llm_async(prompt, model=model, api_key=api_key, response_schema=batch_score_response_schema(field_list))
+
+        for idx, entry in zip(chunk, _split_batch_result(result, len(chunk))):
+            if entry is None:
+                # ---- Incomplete batch output → single-resume fallback ----
+                print(f"[BATCH SCORE] candidate {idx} missing from batched response, retrying alone")
+                resume_json, exp_float, exp_formatted = candidates[idx]
+                prompt = _build_score_prompt(resume_json, jd_json, field_list, exp_float, exp_formatted)
+                entry = await call_llm_async(prompt, model=model, api_key=api_key, response_schema=score_response_schema(field_list))
+            _cache_score_result(cache_keys[idx], entry)
+            raw_results[idx] = entry
+
+    await evaluate_concurrently(chunks, score_chunk)
+
+    return [_finalize_score(result, field_list, weights) for result in raw_results]
+
+
 # # Testing code
 # if __name__ == "__main__":
 #     # Simulated LLM returned scores (0-100 per field)
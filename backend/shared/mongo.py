@@ -0,0 +1,240 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+# ----------------- Pool settings -----------------
+# Per-client connection pool (driver level)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+
+# Registry level: how many clusters we keep warm and for how long
+MONGO_MAX_CLIENTS = int(os.getenv("MONGO_MAX_CLIENTS", "16"))
+MONGO_CLIENT_IDLE_SECONDS = float(os.getenv("MONGO_CLIENT_IDLE_SECONDS", "900"))
+MONGO_HEALTH_CHECK_SECONDS = float(os.getenv("MONGO_HEALTH_CHECK_SECONDS", "60"))
+
+
+class _Entry:
+    def __init__(self, client: MongoClient, pinned: bool = False):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.last_checked = time.monotonic()
+        self.in_use = 0
+        self.retired = False
+        self.pinned = pinned
+
+
+class MongoClientRegistry:
+    """
+    Process-wide MongoClient cache keyed by connection URI.
+
+    MongoClient is thread-safe and owns its own connection pool, so one client
+    per cluster is reused across requests instead of paying DNS/SRV lookup,
+    TLS handshake and server discovery every time.
+    - at most MONGO_MAX_CLIENTS clients (least recently used is closed first)
+    - clients unused for MONGO_CLIENT_IDLE_SECONDS are closed
+    - a client idle longer than MONGO_HEALTH_CHECK_SECONDS is pinged before
+      reuse and replaced if the ping fails
+    - a client evicted or replaced while leased (e.g. under an open cursor)
+      is closed only when its last lease ends
+    - pinned clients (the app's own database) are never evicted, replaced or
+      closed before close_all; the driver reconnects them on its own
+    Acquiring may block (DNS/SRV lookup, ping): async code uses alease().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def _key(uri: str) -> str:
+        # URIs carry credentials; keep only a digest as the key
+        return hashlib.sha256(uri.encode("utf-8")).hexdigest()
+
+    def _acquire(self, uri: str, pin: bool = False) -> _Entry:
+        """Entry for `uri` with one lease taken (in_use += 1)."""
+        if not uri:
+            raise ValueError("MongoDB URL is required")
+
+        key = self._key(uri)
+        to_close: List[MongoClient] = []
+        with self._lock:
+            to_close += self._evict_idle()
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                entry.in_use += 1
+        self._close(to_close)
+
+        # a pinned client is held in module globals: replacing it would leave
+        # the holder with a closed client, so it is left to reconnect itself
+        if entry is not None and not entry.pinned and not self._healthy(entry):
+            self._release(entry)
+            self._close(self._retire_entry(key, entry))
+            entry = None
+
+        if entry is None:
+            created = _Entry(self._create(uri))
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is not None:
+                    # another request created it first; keep theirs
+                    to_close = [created.client]
+                    self._clients.move_to_end(key)
+                else:
+                    entry = self._clients[key] = created
+                    to_close = self._evict_overflow()
+                entry.in_use += 1
+            self._close(to_close)
+
+        with self._lock:
+            entry.pinned = entry.pinned or pin
+            entry.last_used = time.monotonic()
+        return entry
+
+    def _release(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            close_now = entry.retired and entry.in_use == 0
+        if close_now:
+            entry.client.close()
+
+    @contextmanager
+    def lease(self, uri: str):
+        """Shared client for `uri` while the block runs; it is never closed under you. Do NOT close it."""
+        entry = self._acquire(uri)
+        try:
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    @asynccontextmanager
+    async def alease(self, uri: str):
+        """lease() for async code: client creation, the health-check ping and closes run in a worker thread."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire, uri))
+        try:
+            entry = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the thread still takes its lease; give it back once it has
+            acquiring.add_done_callback(self._release_abandoned)
+            raise
+        try:
+            yield entry.client
+        finally:
+            await asyncio.to_thread(self._release, entry)
+
+    def _release_abandoned(self, acquiring: "asyncio.Future") -> None:
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            threading.Thread(target=self._release, args=(acquiring.result(),), daemon=True).start()
+
+    def pin(self, uri: str) -> MongoClient:
+        """Client that stays open for the life of the process (held in module globals, e.g. auth)."""
+        entry = self._acquire(uri, pin=True)
+        self._release(entry)
+        return entry.client
+
+    @staticmethod
+    def _create(uri: str) -> MongoClient:
+        return MongoClient(
+            uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        )
+
+    @staticmethod
+    def _healthy(entry: _Entry) -> bool:
+        if time.monotonic() - entry.last_checked < MONGO_HEALTH_CHECK_SECONDS:
+            return True
+        try:
+            entry.client.admin.command("ping")
+            entry.last_checked = time.monotonic()
+            return True
+        except Exception as e:
+            print(f"⚠️ MongoDB health check failed, reconnecting: {e}")
+            return False
+
+    @staticmethod
+    def _close(clients: List[MongoClient]) -> None:
+        for client in clients:
+            client.close()
+
+    def _retire_entry(self, key: str, entry: _Entry) -> List[MongoClient]:
+        with self._lock:
+            if self._clients.get(key) is entry:
+                del self._clients[key]
+            if entry.retired:
+                return []
+            entry.retired = True
+            return [entry.client] if entry.in_use == 0 else []
+
+    def _retire(self, key: str) -> List[MongoClient]:
+        """Remove an entry (lock held); returns its client if nobody is using it."""
+        entry = self._clients.pop(key)
+        entry.retired = True
+        return [entry.client] if entry.in_use == 0 else []
+
+    def _evict_idle(self) -> List[MongoClient]:
+        now = time.monotonic()
+        closable = []
+        for key in [
+            k for k, e in self._clients.items()
+            if not e.pinned and not e.in_use and now - e.last_used > MONGO_CLIENT_IDLE_SECONDS
+        ]:
+            closable += self._retire(key)
+        return closable
+
+    def _evict_overflow(self) -> List[MongoClient]:
+        closable = []
+        evictable = [k for k, e in self._clients.items() if not e.pinned]
+        while len(self._clients) > MONGO_MAX_CLIENTS and evictable:
+            closable += self._retire(evictable.pop(0))
+        return closable
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            entry.client.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "in_use": sum(1 for e in self._clients.values() if e.in_use),
+                "max_clients": MONGO_MAX_CLIENTS,
+            }
+
+
+mongo_registry = MongoClientRegistry()
+
+
+def mongo_client(uri: str):
+    """
+    Shared, pooled MongoClient for `uri`, leased for a `with` block:
+        with mongo_client(uri) as client: ...
+    Keep the block open as long as the client (or a cursor) is in use. Do NOT close it.
+    """
+    return mongo_registry.lease(uri)
+
+
+def async_mongo_client(uri: str):
+    """
+    mongo_client for async code, without blocking the event loop:
+        async with async_mongo_client(uri) as client: ...
+    """
+    return mongo_registry.alease(uri)
+
+
+def pinned_mongo_client(uri: str) -> MongoClient:
+    """Shared MongoClient that is never evicted; for clients kept in module globals."""
+    return mongo_registry.pin(uri)
@@ -1,6 +1,12 @@
 import fitz  
 from docx import Document
 import os
+import asyncio
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 
 def extract_text_and_links(file_path: str):
     """
@@ -24,16 +30,7 @@ def extract_text_and_links(file_path: str):
 
     try:
         if ext == ".pdf":
-            with fitz.open(file_path) as pdf:
-                for page in pdf:
-                    text += page.get_text("text")
-                    # extract embedded links
-                    for link in page.get_links():
-                        if "uri" in link:
-                            uri = link["uri"]
-                            # Skip email and phone links
-                            if not (uri.lower().startswith("mailto:") or uri.lower().startswith("tel:")):
-                                links.append(uri)
+            text, links = _extract_pdf_pages(file_path)
 
         elif ext == ".docx":
             doc = Document(file_path)
@@ -62,6 +59,200 @@ def extract_text_and_links(file_path: str):
     return text.strip(), links
 
 
+def _extract_pdf_pages(file_path: str, start: int = 0, end: int = None):
+    """
+    Text + links of pages [start, end) of a PDF.
+    Pages are collected in a list and joined once instead of growing a string;
+    a form feed marks each page break (compaction uses it to spot running headers / footers).
+    """
+    parts = []
+    links = []
+    with fitz.open(file_path) as pdf:
+        end = pdf.page_count if end is None else min(end, pdf.page_count)
+        for page_no in range(start, end):
+            page = pdf[page_no]
+            parts.append(page.get_text("text"))
+            # extract embedded links
+            for link in page.get_links():
+                if "uri" in link:
+                    uri = link["uri"]
+                    # Skip email and phone links
+                    if not (uri.lower().startswith("mailto:") or uri.lower().startswith("tel:")):
+                        links.append(uri)
+    return "\f".join(parts), links
+
+
+def _pdf_page_count(file_path: str) -> int:
+    try:
+        with fitz.open(file_path) as pdf:
+            return pdf.page_count
+    except Exception as e:
+        print(f"⚠️ Failed to open {file_path}: {e}")
+        return 0
+
+
+def _extract_pdf_range(file_path: str, start: int, end: int):
+    # same contract as extract_text_and_links: failures give empty output
+    try:
+        return _extract_pdf_pages(file_path, start, end)
+    except Exception as e:
+        print(f"⚠️ Failed to extract pages {start}-{end} of {file_path}: {e}")
+        return "", []
+
+
+# ----------------- Process pool extraction -----------------
+# PyMuPDF / python-docx are CPU bound and a malformed file can hang or crash
+# the parser, so bulk extraction runs in separate processes with a timeout.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "60"))
+# PDFs bigger than this are split into page ranges spread over the pool
+LARGE_PDF_BYTES = int(os.getenv("LARGE_PDF_BYTES", str(5 * 1024 * 1024)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+# futures submitted to each pool, so a retired pool can let its healthy work finish
+_POOL_FUTURES = weakref.WeakKeyDictionary()
+# per event loop: at most EXTRACT_WORKERS files submitted to the shared pool, so
+# nothing waits in its queue and the timeout only covers actual extraction
+_POOL_SLOTS = weakref.WeakKeyDictionary()
+# per event loop: caps concurrent one-file pools after a crash
+_ISOLATION_SLOTS = weakref.WeakKeyDictionary()
+
+
+def _spawn_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: never fork a process that is running an event loop + threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = _spawn_pool(EXTRACT_WORKERS)
+            _POOL_FUTURES[_POOL] = set()
+        return _POOL
+
+
+def _kill_workers(pool: ProcessPoolExecutor) -> None:
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            proc.kill()
+        except Exception:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _drain_and_kill(pool: ProcessPoolExecutor, hung) -> None:
+    """
+    Let every other file of a retired pool finish, then kill its workers
+    (the hung one included). Stops waiting once nothing completes for a
+    whole EXTRACT_TIMEOUT_SECONDS: whatever is left is hung as well.
+    """
+    pending = {f for f in list(_POOL_FUTURES.get(pool, ())) if f is not hung}
+    while pending:
+        done, pending = wait(pending, timeout=EXTRACT_TIMEOUT_SECONDS)
+        if not done:
+            break
+    _kill_workers(pool)
+
+
+def _retire_pool(pool: ProcessPoolExecutor, hung=None) -> None:
+    """
+    Stop sending work to a pool with a hung or dead worker; the next call
+    starts a fresh one. Files already running on the old pool are not
+    touched: it is torn down in the background once they are done.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not pool:
+            return  # already replaced by a concurrent failure
+        _POOL = None
+    threading.Thread(target=_drain_and_kill, args=(pool, hung), daemon=True, name="extract-pool-drain").start()
+
+
+async def _await_pool_future(pool: ProcessPoolExecutor, fn, args, timeout: float):
+    future = pool.submit(fn, *args)
+    futures = _POOL_FUTURES.setdefault(pool, set())
+    futures.add(future)
+    future.add_done_callback(futures.discard)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        _retire_pool(pool, hung=future)
+        raise RuntimeError(f"Text extraction timed out after {timeout:g}s: {args[0]}")
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # the caller itself was cancelled
+        # the pool was torn down under this file: an error for this file only
+        raise BrokenProcessPool(f"extraction pool shut down while processing {args[0]}")
+
+
+async def _run_in_pool(fn, *args, timeout: float):
+    """
+    Run `fn(*args)` in the extraction pool. A file that crashes a worker
+    breaks the whole executor, so every file caught in a broken pool is
+    retried once on a fresh shared pool and then alone in a one-worker pool;
+    only the file that crashes even in isolation gets the error.
+    At most EXTRACT_WORKERS files are in the shared pool at once, so
+    `timeout` counts extraction time, not time spent queued behind others.
+    """
+    for attempt in range(2):
+        try:
+            async with _loop_slots(_POOL_SLOTS):
+                pool = _get_pool()
+                return await _await_pool_future(pool, fn, args, timeout)
+        except BrokenProcessPool:
+            _retire_pool(pool)
+            print(f"⚠️ Extraction pool broke while processing {args[0]}, retrying (attempt {attempt + 1})")
+
+    # at most EXTRACT_WORKERS isolated retries at a time, like the shared pool
+    async with _loop_slots(_ISOLATION_SLOTS):
+        isolated = _spawn_pool(1)
+        try:
+            return await _await_pool_future(isolated, fn, args, timeout)
+        except BrokenProcessPool:
+            raise RuntimeError(f"Text extraction worker crashed on: {args[0]}")
+        finally:
+            _kill_workers(isolated)
+
+
+def _loop_slots(table: weakref.WeakKeyDictionary) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _POOL_LOCK:
+        slots = table.get(loop)
+        if slots is None:
+            slots = table[loop] = asyncio.Semaphore(EXTRACT_WORKERS)
+        return slots
+
+
+async def extract_text_and_links_async(file_path: str, *, timeout: float = EXTRACT_TIMEOUT_SECONDS):
+    """
+    extract_text_and_links in the extraction process pool.
+
+    Large PDFs are split into page ranges parsed in parallel. A file that
+    hangs past `timeout` or crashes its worker raises RuntimeError for that
+    file only; the pool is recycled for everyone else.
+    """
+    is_large_pdf = (
+        os.path.splitext(file_path)[1].lower() == ".pdf"
+        and os.path.exists(file_path)
+        and os.path.getsize(file_path) > LARGE_PDF_BYTES
+    )
+    if not is_large_pdf:
+        return await _run_in_pool(extract_text_and_links, file_path, timeout=timeout)
+
+    page_count = await _run_in_pool(_pdf_page_count, file_path, timeout=timeout)
+    ranges = [(start, start + PDF_PAGES_PER_TASK) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    chunks = await asyncio.gather(*(
+        _run_in_pool(_extract_pdf_range, file_path, start, end, timeout=timeout)
+        for start, end in ranges
+    ))
+    text = "\f".join(chunk_text for chunk_text, _ in chunks)
+    links = [link for _, chunk_links in chunks for link in chunk_links]
+    return text.strip(), links
+
+
 # ----------------- Test Runner -----------------
 if __name__ == "__main__":
     # Path to resume file
@@ -101,8 +292,7 @@ def extract_text_from_jd(file_path: str):
     try:
         if ext == ".pdf":
             with fitz.open(file_path) as pdf:
-                for page in pdf:
-                    text += page.get_text("text")
+                text = "".join(page.get_text("text") for page in pdf)
 
         elif ext == ".docx":
             doc = Document(file_path)
@@ -1,14 +1,102 @@
+import os
+import asyncio
 from datetime import datetime, timezone
+from typing import Optional
 from backend.fetch_from_db_backend.db_fetcher import fetch_resumes
-from backend.shared.parser import extract_text_and_links
+from backend.shared.parser import extract_text_and_links, extract_text_and_links_async
 from backend.shared.utils import (
     format_experience_years,
     total_experience_from_resume,
     build_evaluation,
+    compute_total_score,
+)
+from backend.shared.cache import hash_file, make_key, resume_cache
+from backend.shared.llm import (
+    RESUME_PROMPT_VERSION,
+    generate_jd_json,
+    generate_resume_json,
+    generate_resume_json_async,
+    generate_score,
+    generate_score_async,
+    generate_scores_batch_async,
+    jd_fingerprint,
+    resume_fingerprint,
 )
-from backend.shared.llm import generate_jd_json, generate_resume_json, generate_score
 import json
 
+# Re-runs of a JD reuse evaluations that are still current instead of paying for them again
+INCREMENTAL_EVALUATION = os.getenv("INCREMENTAL_EVALUATION", "1") != "0"
+
+def _resume_cache_key(resume_file_path: str, model: str):
+    try:
+        return make_key(hash_file(resume_file_path), model, RESUME_PROMPT_VERSION)
+    except OSError:
+        return None
+
+
+def _is_cacheable_resume(resume_json: dict) -> bool:
+    # LLM failures come back as an empty schema; never cache those
+    return bool(resume_json.get("name") or resume_json.get("email") or resume_json.get("skills"))
+
+
+def _evaluation_for(scored_result: dict, jd_json: dict, resume_json: dict, model: str) -> dict:
+    return build_evaluation(
+        scored_result,
+        jd_json,
+        model=model,
+        jd_fingerprint=jd_fingerprint(jd_json),
+        resume_fingerprint=resume_fingerprint(resume_json),
+    )
+
+
+# ----------------- Incremental evaluation -----------------
+def _current_evaluation_index(document: dict, jd_fp: str, resume_fp: str, model: str) -> Optional[int]:
+    evaluations = document.get("evaluations") or []
+    for idx in range(len(evaluations) - 1, -1, -1):
+        evaluation = evaluations[idx]
+        if (
+            evaluation.get("jd_fingerprint") == jd_fp
+            and evaluation.get("resume_fingerprint") == resume_fp
+            and evaluation.get("model") == model
+        ):
+            return idx
+    return None
+
+
+def has_current_evaluation(document: dict, jd_json: dict, model: str) -> bool:
+    """True when the document already holds an evaluation of this resume for this JD + model."""
+    resume_fp = resume_fingerprint(document.get("resume_json") or {})
+    return _current_evaluation_index(document, jd_fingerprint(jd_json), resume_fp, model) is not None
+
+
+def reuse_evaluation(document: dict, jd_json: dict, weights: dict, model: str) -> str:
+    """
+    Incremental mode: reuse a stored evaluation when neither the JD, the
+    resume nor the model changed since it was made. Its total is recomputed
+    for `weights` and it becomes the latest evaluation, as a fresh one would.
+    It is flagged "reused" so export_to_mongo updates the stored copy instead
+    of appending a duplicate.
+
+    Returns "reused", "changed" (scored for this JD + model before, but the
+    resume differs now) or "new".
+    """
+    jd_fp = jd_fingerprint(jd_json)
+    resume_fp = resume_fingerprint(document.get("resume_json") or {})
+    evaluations = document.setdefault("evaluations", [])
+
+    idx = _current_evaluation_index(document, jd_fp, resume_fp, model)
+    if idx is not None:
+        evaluation = evaluations.pop(idx)
+        evaluation["score"] = compute_total_score(evaluation.get("scoring_breakdown") or {}, weights or {})
+        evaluation["reused"] = True
+        evaluations.append(evaluation)
+        return "reused"
+
+    if any(e.get("jd_fingerprint") == jd_fp and e.get("model") == model for e in evaluations):
+        return "changed"
+    return "new"
+
+
 def run_pipeline_db(
     document,
     weights: dict = None,
@@ -50,7 +138,7 @@ def run_pipeline_db(
                 model=model,
             )
 
-        evaluation = build_evaluation(scored_result, jd_json)
+        evaluation = _evaluation_for(scored_result, jd_json, resume_json, model)
         evaluations.append(evaluation)
 
     print("Scoring Completed...")
@@ -70,18 +158,25 @@ def run_pipeline(
 ) -> dict:
 
     print("Starting Pipeline...")
-    # 1️⃣ Extract text
-    print("Extracting Text...")
-    resume_text, resume_links = extract_text_and_links(resume_file_path)
-    resume_text_with_links = resume_text + "\n\nLinks found: " + ", ".join(resume_links)
-
-    # 2️⃣ LLM → resume JSON
-    print("Generating Resume Json")
-    resume_json = generate_resume_json(
-        resume_text_with_links,
-        api_key=api_key,
-        model=model
-    )
+    # 0️⃣ Same file + model + prompt already parsed? Skip extraction and the LLM parse
+    cache_key = _resume_cache_key(resume_file_path, model)
+    resume_json = resume_cache.get(cache_key) if cache_key else None
+
+    if resume_json is None:
+        # 1️⃣ Extract text
+        print("Extracting Text...")
+        resume_text, resume_links = extract_text_and_links(resume_file_path)
+        resume_text_with_links = resume_text + "\n\nLinks found: " + ", ".join(resume_links)
+
+        # 2️⃣ LLM → resume JSON
+        print("Generating Resume Json")
+        resume_json = generate_resume_json(
+            resume_text_with_links,
+            api_key=api_key,
+            model=model
+        )
+        if cache_key and _is_cacheable_resume(resume_json):
+            resume_cache.set(cache_key, resume_json)
 
     # 3️⃣ Experience
     float_experience_years = total_experience_from_resume(
@@ -110,11 +205,150 @@ def run_pipeline(
             model=model,
         )
 
-        evaluation = build_evaluation(scored_result, jd_json)
+        evaluation = _evaluation_for(scored_result, jd_json, resume_json, model)
         document["evaluations"].append(evaluation)
     print(f"Document :\n{document}")
     return document
 
+
+# ----------------- Async variants (used by the FastAPI routers) -----------------
+async def run_pipeline_db_async(
+    document,
+    weights: dict = None,
+    jd_json: dict = None,
+    *,
+    username=None,
+    api_key=None,
+    model="gemini-2.5-flash"
+):
+    """
+    asyncio version of run_pipeline_db: awaits the LLM instead of blocking the event loop.
+    """
+    resume_json=document.get("resume_json",{})
+    evaluations=document.setdefault("evaluations",[])
+
+    float_experience_years = total_experience_from_resume(
+    resume_json.get("experience", [])
+    )
+    formatted_exp=format_experience_years(float_experience_years)
+    resume_json["total_experience_years"] = formatted_exp
+    resume_json.pop("uploaded_at", None)
+
+    if jd_json:
+        scored_result = await generate_score_async(
+                resume_json,
+                jd_json,
+                weights or {},
+                float_experience_years,
+                formatted_exp,
+                api_key=api_key,
+                model=model,
+            )
+
+        evaluation = _evaluation_for(scored_result, jd_json, resume_json, model)
+        evaluations.append(evaluation)
+
+    return document
+
+
+async def score_documents_batched(
+    documents: list,
+    jd_json: dict,
+    weights: dict = None,
+    *,
+    batch_size: int = 5,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash",
+    incremental: bool = False
+) -> list:
+    """
+    Score already-parsed documents against one JD, packing `batch_size`
+    resumes into each LLM request. Appends one evaluation per document
+    (with `incremental`, documents that already have a current one are skipped).
+    """
+    if incremental:
+        documents = [document for document in documents if not has_current_evaluation(document, jd_json, model)]
+
+    candidates = []
+    for document in documents:
+        resume_json = document.get("resume_json", {})
+        float_experience_years = total_experience_from_resume(resume_json.get("experience", []))
+        formatted_exp = format_experience_years(float_experience_years)
+        resume_json["total_experience_years"] = formatted_exp
+        candidates.append((resume_json, float_experience_years, formatted_exp))
+
+    scored_results = await generate_scores_batch_async(
+        candidates,
+        jd_json,
+        weights or {},
+        batch_size=batch_size,
+        api_key=api_key,
+        model=model,
+    )
+
+    for document, scored_result in zip(documents, scored_results):
+        document.setdefault("evaluations", []).append(
+            _evaluation_for(scored_result, jd_json, document.get("resume_json", {}), model)
+        )
+    return documents
+
+
+async def run_pipeline_async(
+    resume_file_path: str,
+    weights: dict = None,
+    jd_json: dict = None,
+    *,
+    username: str = None,
+    api_key: str = None,
+    model: str = "gemini-2.5-flash"
+) -> dict:
+    """
+    asyncio version of run_pipeline. Text extraction is CPU bound so it runs
+    in the parser's process pool; both LLM calls are awaited. A resume_cache hit
+    skips extraction and the parse call entirely.
+    """
+    cache_key = await asyncio.to_thread(_resume_cache_key, resume_file_path, model)
+    resume_json = resume_cache.get(cache_key) if cache_key else None
+
+    if resume_json is None:
+        resume_text, resume_links = await extract_text_and_links_async(resume_file_path)
+        resume_text_with_links = resume_text + "\n\nLinks found: " + ", ".join(resume_links)
+
+        resume_json = await generate_resume_json_async(
+            resume_text_with_links,
+            api_key=api_key,
+            model=model
+        )
+        if cache_key and _is_cacheable_resume(resume_json):
+            resume_cache.set(cache_key, resume_json)
+
+    float_experience_years = total_experience_from_resume(
+        resume_json.get("experience", [])
+    )
+    formatted_exp=format_experience_years(float_experience_years)
+    resume_json["total_experience_years"] = formatted_exp
+    resume_json["uploaded_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    document={
+        "resume_json":resume_json,
+        "evaluations":[]
+    }
+
+    if jd_json:
+        scored_result = await generate_score_async(
+            resume_json,
+            jd_json,
+            weights or {},
+            float_experience_years,
+            formatted_exp,
+            api_key=api_key,
+            model=model,
+        )
+
+        evaluation = _evaluation_for(scored_result, jd_json, resume_json, model)
+        document["evaluations"].append(evaluation)
+    return document
+
 # import json
 
 # # --------------------------
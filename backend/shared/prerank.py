@@ -0,0 +1,159 @@
+import os
+import re
+import math
+import heapq
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# 0 = disabled: every candidate goes to generate_score
+PRERANK_TOP_K = int(os.getenv("PRERANK_TOP_K", "0"))
+
+
+def parse_prerank_top_k(value) -> int:
+    """jd_data["prerank_top_k"] as an int >= 0 (None / "" = default); ValueError otherwise."""
+    if value in (None, ""):
+        return PRERANK_TOP_K
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"prerank_top_k must be a non-negative integer, got {value!r}")
+    return value
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens that keep tech names intact: c++, c#, node.js, .net → net."""
+    return [tok.rstrip(".") for tok in _TOKEN_RE.findall(text.lower())]
+
+
+def _flatten(value: Any) -> List[str]:
+    if isinstance(value, dict):
+        return [part for v in value.values() for part in _flatten(v)]
+    if isinstance(value, list):
+        return [part for v in value for part in _flatten(v)]
+    if value is None:
+        return []
+    return [str(value)]
+
+
+def serialize_resume(resume_json: dict) -> str:
+    """Text used for ranking: skills and work content only, no contact details."""
+    parts = []
+    parts += _flatten(resume_json.get("skills", [])) * 2  # skills count double
+    for proj in resume_json.get("projects", []) or []:
+        parts += _flatten([proj.get("title"), proj.get("description"), proj.get("technologies")])
+    for exp in resume_json.get("experience", []) or []:
+        parts += _flatten([exp.get("role"), exp.get("company"), exp.get("description")])
+    for edu in resume_json.get("education", []) or []:
+        parts += _flatten([edu.get("degree"), edu.get("institution")])
+    parts += _flatten(resume_json.get("certifications", []))
+    parts += _flatten(resume_json.get("location"))
+    return " ".join(parts)
+
+
+def serialize_jd(jd_json: dict) -> str:
+    return " ".join(_flatten(jd_json))
+
+
+def _resume_tokens(doc: dict) -> List[str]:
+    return tokenize(serialize_resume(doc.get("resume_json", {})))
+
+
+class BM25:
+    """Okapi BM25 over pre-tokenized documents (pure Python, no LLM, no model download)."""
+
+    def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs = [Counter(doc) for doc in corpus]
+        self.doc_lens = [len(doc) for doc in corpus]
+        self.avg_len = (sum(self.doc_lens) / len(corpus)) if corpus else 0.0
+
+        df = Counter()
+        for freqs in self.doc_freqs:
+            df.update(freqs.keys())
+        self.idf = self._idf(df, len(corpus))
+
+    @classmethod
+    def from_stats(cls, n: int, total_len: int, df: Counter, k1: float = 1.5, b: float = 0.75) -> "BM25":
+        """
+        Scorer from corpus statistics alone (document count, total length,
+        document frequencies), for corpora too large to keep: documents are
+        then scored one at a time with score().
+        """
+        bm25 = cls([], k1, b)
+        bm25.avg_len = total_len / n if n else 0.0
+        bm25.idf = cls._idf(df, n)
+        return bm25
+
+    @staticmethod
+    def _idf(df: Counter, n: int) -> Dict[str, float]:
+        return {term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def score(self, freqs: Counter, doc_len: int, query: List[str]) -> float:
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_len) if self.avg_len else self.k1
+        score = 0.0
+        for term in set(query):
+            tf = freqs.get(term)
+            if tf and term in self.idf:
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    def scores(self, query: List[str]) -> List[float]:
+        return [self.score(freqs, doc_len, query) for freqs, doc_len in zip(self.doc_freqs, self.doc_lens)]
+
+
+def prerank_stream(open_documents: Callable[[], Iterable[Dict]], jd_json: dict, top_k: int) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    First-stage ranking of candidate documents against a JD with BM25,
+    holding at most `top_k` documents in memory.
+
+    BM25 needs corpus-wide statistics before any document can be scored, so
+    `open_documents()` is iterated twice: once for the document count,
+    lengths and document frequencies of the JD terms, once to score every
+    document into a bounded heap. Ties keep the earlier document.
+
+    The forwarded documents get a "prerank_score" (0-100, relative to the
+    best match). Returns (top_k documents, best first; summary) — only those
+    should be forwarded to generate_score. top_k=0 keeps every document.
+    """
+    query = tokenize(serialize_jd(jd_json))
+    terms = set(query)
+
+    n = total_len = 0
+    df = Counter()
+    for doc in open_documents():
+        tokens = _resume_tokens(doc)
+        n += 1
+        total_len += len(tokens)
+        df.update(terms.intersection(tokens))
+    bm25 = BM25.from_stats(n, total_len, df)
+
+    # min-heap of (score, -position, document): the root is the weakest kept candidate
+    heap: List[Tuple[float, int, Dict]] = []
+    best = 0.0
+    candidates = 0
+    for doc in open_documents():
+        tokens = _resume_tokens(doc)
+        score = bm25.score(Counter(tokens), len(tokens), query)
+        best = max(best, score)
+        entry = (score, -candidates, doc)
+        candidates += 1
+        if not top_k or len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    best = best or 1.0
+    selected = []
+    for score, _, doc in sorted(heap, key=lambda entry: entry[:2], reverse=True):
+        doc["prerank_score"] = round(100.0 * score / best, 2)
+        selected.append(doc)
+
+    return selected, {
+        "candidates": candidates,
+        "forwarded": len(selected),
+        "top_k": top_k,
+        "cutoff_score": selected[-1]["prerank_score"] if selected else None,
+    }
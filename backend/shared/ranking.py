@@ -0,0 +1,126 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# ----------------- Vectorized scoring helpers -----------------
+def build_score_matrix(documents: List[Dict]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Load the latest evaluation's scoring_breakdown of every document into a
+    dense candidate x field matrix.
+
+    Returns (scores, present, fields):
+        scores  -> float matrix, already clipped to [0, 100]
+        present -> bool matrix, True where the candidate was scored on that field
+        fields  -> column order
+    """
+    breakdowns = []
+    field_index: Dict[str, int] = {}
+    for doc in documents:
+        evaluations = doc.get("evaluations") or []
+        breakdown = evaluations[-1].get("scoring_breakdown", {}) if evaluations else {}
+        breakdowns.append(breakdown or {})
+        for field in breakdown or {}:
+            field_index.setdefault(field, len(field_index))
+
+    scores = np.zeros((len(documents), len(field_index)), dtype=np.float64)
+    present = np.zeros((len(documents), len(field_index)), dtype=bool)
+    for row, breakdown in enumerate(breakdowns):
+        for field, value in breakdown.items():
+            col = field_index[field]
+            try:
+                scores[row, col] = float(value)
+            except (TypeError, ValueError):
+                scores[row, col] = 0.0
+            present[row, col] = True
+
+    np.clip(scores, 0.0, 100.0, out=scores)
+    return scores, present, list(field_index)
+
+
+def weight_vector(fields: List[str], weights: Dict) -> np.ndarray:
+    """Weights aligned to `fields`; missing, non-numeric and non-positive weights count as 0."""
+    vec = np.zeros(len(fields), dtype=np.float64)
+    for col, field in enumerate(fields):
+        w = (weights or {}).get(field, 0)
+        if isinstance(w, (int, float)) and w > 0:
+            vec[col] = w
+    return vec
+
+
+# ----------------- Ranking engine -----------------
+class RankingEngine:
+    """
+    Ranks one evaluated result set under any number of weightings.
+
+    The latest scoring_breakdown of every candidate is loaded once into a
+    dense field x candidate matrix; re-weighting is then a single matmul
+    (no per-resume dict loops), and top-K uses a partition instead of a
+    full sort.
+    """
+
+    def __init__(self, documents: List[Dict]):
+        self.documents = documents
+        scores, present, self.fields = build_score_matrix(documents)
+        self.size = len(documents)
+        # [scores | present] side by side: w @ matrix gives every weighted sum
+        # and every per-candidate weight total in one product
+        self._matrix = np.ascontiguousarray(np.hstack([scores.T, present.T.astype(np.float64)]))
+
+    def totals(self, weights: Dict) -> np.ndarray:
+        """
+        Total score per candidate, same semantics as utils.compute_total_score:
+        each candidate's weights are normalized over the fields it was actually
+        scored on, totals are rounded to 2 decimals and a candidate with no
+        weighted field gets 0.0.
+        """
+        if self.size == 0 or not self.fields:
+            return np.zeros(self.size, dtype=np.float64)
+
+        product = weight_vector(self.fields, weights) @ self._matrix
+        weighted_sum, total_weight = product[:self.size], product[self.size:]
+
+        totals = np.zeros(self.size, dtype=np.float64)
+        np.divide(weighted_sum, total_weight, out=totals, where=total_weight > 0)
+        return np.round(totals, 2)
+
+    def top_k(self, weights: Dict, k: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (indices of the best k candidates, highest first; totals of all candidates).
+        k=None ranks everyone. Ties keep input order, also at the k-th place:
+        of the candidates tied there, the earliest ones are kept.
+        """
+        totals = self.totals(weights)
+        if k is None or k >= self.size:
+            candidates = np.arange(self.size)
+        elif k <= 0:
+            return np.empty(0, dtype=np.intp), totals
+        else:
+            # argpartition picks an arbitrary subset of a tie at the cutoff,
+            # so only the k-th total is taken from it
+            cutoff = -np.partition(-totals, k - 1)[k - 1]
+            above = np.flatnonzero(totals > cutoff)
+            tied = np.flatnonzero(totals == cutoff)[:k - above.size]
+            candidates = np.concatenate([above, tied])
+        order = candidates[np.lexsort((candidates, -totals[candidates]))]
+        return order, totals
+
+    def rank(self, weights: Dict, k: int = None) -> List[Dict]:
+        """Write the new totals into each latest evaluation and return the top-k documents."""
+        order, totals = self.top_k(weights, k)
+        for doc, total in zip(self.documents, totals):
+            evaluations = doc.get("evaluations") or []
+            if evaluations:
+                evaluations[-1]["score"] = float(total)
+        return [self.documents[i] for i in order]
+
+
+def rerank_documents(documents: List[Dict], weights: Dict, top_k: int = None) -> List[Dict]:
+    """
+    Recompute the latest evaluation's score of every document with new weights
+    and return the documents sorted by that score (highest first), optionally
+    only the best `top_k`. No LLM calls: only scoring_breakdown is used.
+    """
+    if not documents:
+        return []
+    return RankingEngine(documents).rank(weights, top_k)
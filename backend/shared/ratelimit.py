@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from backend.shared.compaction import count_tokens
+
+# ----------------- Quota settings -----------------
+# Budgets per (API key, model); 0 disables that budget
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "60"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "1000000"))
+# Output tokens reserved per call until the real usage is known
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+# How many (key, model) limiters are kept; least recently used are dropped
+LLM_MAX_LIMITERS = int(os.getenv("LLM_MAX_LIMITERS", "1024"))
+
+_RETRY_AFTER_RE = re.compile(r"retry(?:[_ ]?delay|[_ -]?after| in)?['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)\s*s", re.I)
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough Gemini token count of the prompt plus the expected output."""
+    return count_tokens(prompt) + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+def is_rate_limited(err_str: str) -> bool:
+    return "429" in err_str or "RESOURCE_EXHAUSTED" in err_str or "rate limit" in err_str.lower()
+
+
+def parse_retry_after(err_str: str) -> Optional[float]:
+    """'…retryDelay': '17s'…' or 'Please retry in 17.4s' → 17.4 (None when absent)."""
+    match = _RETRY_AFTER_RE.search(err_str)
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Refills `capacity` units per minute, continuously. Not thread-safe on its own."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)  # a single oversized call must still fit eventually
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one (API key, model).
+
+    Callers wait in FIFO order (async callers through a per-loop asyncio.Lock),
+    so a burst is smoothed into a steady stream instead of a 429 storm.
+    A 429 with a retry-after hint pauses every caller of the key, not just
+    the one that got it.
+    """
+
+    def __init__(self, label: str, model: str, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT):
+        self.label = label
+        self.model = model
+        self._state = threading.Lock()
+        self._sync_turn = threading.Lock()
+        self._async_turns = weakref.WeakKeyDictionary()
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._blocked_until = 0.0
+        self._window = deque()  # (timestamp, requests, tokens) seen in the last minute
+        self.waiting = 0
+        self.last_used = time.monotonic()
+        self.counters = {"calls": 0, "tokens": 0, "throttled_seconds": 0.0, "rate_limited": 0}
+
+    # ----------------- Reservation -----------------
+    def _reserve(self, tokens: int) -> float:
+        """Take the budget for one call and return 0, or return how long to wait."""
+        with self._state:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            wait = 0.0
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > 0:
+                return wait
+
+            if self._requests is not None:
+                self._requests.available -= 1
+            if self._tokens is not None:
+                self._tokens.available -= min(tokens, self._tokens.capacity)
+            self._window.append((now, 1, tokens))
+            self._trim_window(now)
+            self.counters["calls"] += 1
+            self.counters["tokens"] += tokens
+            self.last_used = now
+            return 0.0
+
+    def _trim_window(self, now: float) -> None:
+        while self._window and now - self._window[0][0] > 60:
+            self._window.popleft()
+
+    def _async_turn(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._state:
+            lock = self._async_turns.get(loop)
+            if lock is None:
+                lock = self._async_turns[loop] = asyncio.Lock()
+            return lock
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait (without blocking the loop) until the call fits the budget. Returns seconds waited."""
+        started = time.monotonic()
+        self._add_waiting(1)
+        try:
+            async with self._async_turn():
+                while True:
+                    wait = self._reserve(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self._add_waiting(-1)
+        return self._note_wait(started)
+
+    def acquire_sync(self, tokens: int) -> float:
+        """Blocking acquire for threaded callers (call_llm)."""
+        started = time.monotonic()
+        self._add_waiting(1)
+        try:
+            with self._sync_turn:
+                while True:
+                    wait = self._reserve(tokens)
+                    if wait <= 0:
+                        break
+                    time.sleep(wait)
+        finally:
+            self._add_waiting(-1)
+        return self._note_wait(started)
+
+    def _add_waiting(self, delta: int) -> None:
+        # async and threaded callers share the counter (the registry reads it to skip evicting busy limiters)
+        with self._state:
+            self.waiting += delta
+
+    def _note_wait(self, started: float) -> float:
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            with self._state:
+                self.counters["throttled_seconds"] += waited
+        return waited
+
+    # ----------------- Feedback -----------------
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once the real usage of a call is known."""
+        if not actual or self._tokens is None:
+            return
+        with self._state:
+            self._tokens.available -= actual - estimated
+            self._window.append((time.monotonic(), 0, actual - estimated))
+            self.counters["tokens"] += actual - estimated
+
+    def penalize(self, seconds: float) -> None:
+        """Server said 429: hold every caller of this key/model for `seconds`."""
+        with self._state:
+            self.counters["rate_limited"] += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            # the server's view of our budget is lower than ours: start from empty
+            if self._requests is not None:
+                self._requests.available = min(self._requests.available, 0.0)
+
+    # ----------------- Stats -----------------
+    def stats(self) -> Dict[str, Any]:
+        with self._state:
+            now = time.monotonic()
+            self._trim_window(now)
+            requests_last_minute = sum(r for _, r, _ in self._window)
+            tokens_last_minute = max(0, sum(t for _, _, t in self._window))
+            rpm = int(self._requests.capacity) if self._requests else None
+            tpm = int(self._tokens.capacity) if self._tokens else None
+            return {
+                "key": self.label,
+                "model": self.model,
+                "rpm_limit": rpm,
+                "tpm_limit": tpm,
+                "requests_last_minute": requests_last_minute,
+                "tokens_last_minute": tokens_last_minute,
+                "rpm_utilization": round(requests_last_minute / rpm, 3) if rpm else None,
+                "tpm_utilization": round(tokens_last_minute / tpm, 3) if tpm else None,
+                "waiting": self.waiting,
+                "blocked_for_seconds": round(max(0.0, self._blocked_until - now), 2),
+                "calls": self.counters["calls"],
+                "tokens": self.counters["tokens"],
+                "throttled_seconds": round(self.counters["throttled_seconds"], 2),
+                "rate_limited": self.counters["rate_limited"],
+            }
+
+
+class RateLimiterRegistry:
+    """One RateLimiter per (API key hash, model), LRU-bounded. Keys are never stored."""
+
+    def __init__(self, max_limiters: int = LLM_MAX_LIMITERS):
+        self._lock = threading.Lock()
+        self._limiters: "OrderedDict[tuple, RateLimiter]" = OrderedDict()
+        self.max_limiters = max_limiters
+
+    @staticmethod
+    def key_label(api_key: Optional[str]) -> str:
+        # None → the server's GEMINI_API_KEY client
+        if not api_key:
+            return "env"
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, api_key: Optional[str], model: str) -> RateLimiter:
+        key = (self.key_label(api_key), model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = RateLimiter(key[0], model)
+                while len(self._limiters) > self.max_limiters:
+                    oldest_key, oldest = next(iter(self._limiters.items()))
+                    if oldest.waiting:
+                        break
+                    del self._limiters[oldest_key]
+            else:
+                self._limiters.move_to_end(key)
+            return limiter
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return [limiter.stats() for limiter in limiters]
+
+
+llm_rate_limiter = RateLimiterRegistry()
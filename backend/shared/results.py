@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from backend.shared.config import DATA_DIR
+from backend.shared.utils import total_experience_from_resume
+
+RESULTS_DB_PATH = DATA_DIR / "results.sqlite3"
+
+# Stored result sets older than this are dropped on the next save
+RESULTS_TTL_SECONDS = float(os.getenv("RESULTS_TTL_SECONDS", str(7 * 24 * 3600)))
+RESULTS_MAX_PAGE_SIZE = int(os.getenv("RESULTS_MAX_PAGE_SIZE", "200"))
+# Rows returned with an evaluate response; the rest is paged via /results
+RESULTS_FIRST_PAGE_SIZE = int(os.getenv("RESULTS_FIRST_PAGE_SIZE", "10"))
+
+# sort key → SQL column (every sort falls back to input order for ties)
+SORT_COLUMNS = {
+    "score": "score",
+    "experience": "experience",
+    "name": "name COLLATE NOCASE",
+    "uploaded_at": "uploaded_at",
+}
+
+
+def _skill_key(skills) -> str:
+    """['Python', 'SQL'] → '|python|sql|' so one skill can be matched with LIKE."""
+    if not isinstance(skills, list):
+        return "|"
+    return "|" + "|".join(str(s).strip().lower().replace("|", " ") for s in skills if str(s).strip()) + "|"
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class ResultStore:
+    """
+    Finished evaluation sets kept server-side (SQLite), so the UI can ask
+    for one sorted / filtered page instead of holding and re-sorting the
+    whole list on every rerun.
+    """
+
+    def __init__(self, db_path=RESULTS_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS result_sets (
+                    id TEXT PRIMARY KEY,
+                    username TEXT,
+                    total INTEGER NOT NULL,
+                    meta TEXT,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS result_items (
+                    result_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    score REAL,
+                    experience REAL,
+                    name TEXT,
+                    location TEXT,
+                    uploaded_at TEXT,
+                    matched_skills TEXT,
+                    missing_skills TEXT,
+                    document TEXT NOT NULL,
+                    PRIMARY KEY (result_id, idx)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_result_items_score ON result_items (result_id, score)")
+            self._conn.commit()
+
+    # ----------------- Write -----------------
+    @staticmethod
+    def _row(result_id: str, idx: int, doc: Dict) -> tuple:
+        resume_json = doc.get("resume_json") or {}
+        evaluations = doc.get("evaluations") or []
+        latest = evaluations[-1] if evaluations else {}
+        score = latest.get("score")
+        return (
+            result_id,
+            idx,
+            float(score) if isinstance(score, (int, float)) else None,
+            total_experience_from_resume(resume_json.get("experience", [])),
+            (resume_json.get("name") or "").strip(),
+            (resume_json.get("location") or "").strip().lower(),
+            str(resume_json.get("uploaded_at") or ""),
+            _skill_key(latest.get("matched_skills")),
+            _skill_key(latest.get("missing_skills")),
+            json.dumps(doc, default=str),
+        )
+
+    def save(self, username: str, documents: List[Dict], meta: Dict[str, Any] = None) -> str:
+        result_id = uuid.uuid4().hex
+        rows = [self._row(result_id, idx, doc) for idx, doc in enumerate(documents)]
+        with self._lock:
+            self._purge_expired()
+            self._conn.execute(
+                "INSERT INTO result_sets (id, username, total, meta, created_at) VALUES (?, ?, ?, ?, ?)",
+                (result_id, username, len(rows), json.dumps(meta or {}, default=str), time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO result_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+        return result_id
+
+    def replace_documents(self, result_id: str, documents: List[Dict]) -> None:
+        """Overwrite a stored set in place (e.g. after re-weighting), keeping its id."""
+        rows = [self._row(result_id, idx, doc) for idx, doc in enumerate(documents)]
+        with self._lock:
+            self._conn.execute("DELETE FROM result_items WHERE result_id = ?", (result_id,))
+            self._conn.executemany("INSERT INTO result_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("UPDATE result_sets SET total = ? WHERE id = ?", (len(rows), result_id))
+            self._conn.commit()
+
+    def delete(self, result_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM result_items WHERE result_id = ?", (result_id,))
+            self._conn.execute("DELETE FROM result_sets WHERE id = ?", (result_id,))
+            self._conn.commit()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - RESULTS_TTL_SECONDS
+        expired = [r for (r,) in self._conn.execute("SELECT id FROM result_sets WHERE created_at < ?", (cutoff,))]
+        for result_id in expired:
+            self._conn.execute("DELETE FROM result_items WHERE result_id = ?", (result_id,))
+            self._conn.execute("DELETE FROM result_sets WHERE id = ?", (result_id,))
+
+    # ----------------- Read -----------------
+    def get_set(self, result_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, username, total, meta, created_at FROM result_sets WHERE id = ?", (result_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"result_id": row[0], "username": row[1], "total": row[2], "meta": json.loads(row[3] or "{}"), "created_at": row[4]}
+
+    def owned_documents(self, result_id: str, username: str) -> Optional[List[Dict]]:
+        """Every document of a set (e.g. for an export), or None if it does not exist or belongs to someone else."""
+        result_set = self.get_set(result_id)
+        if not result_set or result_set.get("username") != username:
+            return None
+        return self.all_documents(result_id)
+
+    def all_documents(self, result_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document FROM result_items WHERE result_id = ? ORDER BY idx", (result_id,)
+            ).fetchall()
+        return [json.loads(doc) for (doc,) in rows]
+
+    def query(
+        self,
+        result_id: str,
+        *,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "score",
+        descending: bool = True,
+        min_score: float = None,
+        matched_skill: str = None,
+        missing_skill: str = None,
+        location: str = None,
+    ) -> Dict[str, Any]:
+        """One page of a stored set; sorting, filtering and slicing happen in SQLite."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key '{sort}'. Use one of: {', '.join(SORT_COLUMNS)}")
+        limit = max(1, min(int(limit), RESULTS_MAX_PAGE_SIZE))
+        page = max(1, int(page))
+
+        clauses = ["result_id = ?"]
+        params: List[Any] = [result_id]
+        if min_score is not None:
+            clauses.append("score >= ?")
+            params.append(float(min_score))
+        if matched_skill:
+            clauses.append("matched_skills LIKE ? ESCAPE '\\'")
+            params.append(f"%|{_like_escape(matched_skill.strip().lower())}|%")
+        if missing_skill:
+            clauses.append("missing_skills LIKE ? ESCAPE '\\'")
+            params.append(f"%|{_like_escape(missing_skill.strip().lower())}|%")
+        if location:
+            clauses.append("location LIKE ? ESCAPE '\\'")
+            params.append(f"%{_like_escape(location.strip().lower())}%")
+        where = " AND ".join(clauses)
+
+        direction = "DESC" if descending else "ASC"
+        # unscored candidates always go last
+        order = f"{SORT_COLUMNS[sort].split()[0]} IS NULL, {SORT_COLUMNS[sort]} {direction}, idx ASC"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM result_items WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT document FROM result_items WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                (*params, limit, (page - 1) * limit)
+            ).fetchall()
+
+        return {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": (total + limit - 1) // limit,
+            "data": [json.loads(doc) for (doc,) in rows],
+        }
+
+
+result_store = ResultStore()
@@ -34,7 +34,8 @@ class ResumeSchema(BaseModel):
     certifications: List[str] = []
   
 class ExportRequest(BaseModel):
-    processed_resumes: List[Dict]
+    result_id: Optional[str] = None             # stored set from an evaluate call
+    processed_resumes: List[Dict] = []          # or the documents themselves
     mode: str = "new_file"           
     file_path: Optional[str] = None  
     sheet_name: Optional[str] = None  
@@ -79,6 +80,9 @@ class Evaluation(BaseModel):
     other_skills: List[str] = []
     scoring_breakdown: dict = {}
     evaluated_at: Optional[datetime] = None
+    model: Optional[str] = None
+    jd_fingerprint: Optional[str] = None
+    resume_fingerprint: Optional[str] = None
 
 class ResumeInfo(BaseModel):
     name: str
@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import types as pytypes
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin
+
+from google.genai import types
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# 0 = plain text responses parsed from markdown (the old behaviour)
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") != "0"
+
+_STRING_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+_SCORE_LISTS = ("overall_summary", "matched_skills", "missing_skills", "other_skills")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+# how many cut points a truncated response is tried at before giving up
+_MAX_REPAIR_CUTS = 50
+
+
+def generation_config(response_schema: Optional[dict] = None) -> Optional[types.GenerateContentConfig]:
+    """
+    JSON mode for generate_content: the model must answer with JSON, shaped
+    by `response_schema` when one is given (Gemini OpenAPI-subset dict).
+    """
+    if not LLM_STRUCTURED_OUTPUT:
+        return None
+    return types.GenerateContentConfig(response_mime_type="application/json", response_schema=response_schema)
+
+
+# ----------------- Response schemas -----------------
+def _schema_for(annotation, exclude: tuple = ()) -> dict:
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (Union, pytypes.UnionType):
+        inner = [arg for arg in args if arg is not type(None)]
+        return {**_schema_for(inner[0], exclude), "nullable": True}
+    if origin in (list, List):
+        return {"type": "ARRAY", "items": _schema_for(args[0] if args else str, exclude)}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return schema_from_model(annotation, exclude)
+    if annotation is bool:
+        return {"type": "BOOLEAN"}
+    if annotation is int:
+        return {"type": "INTEGER"}
+    if annotation is float:
+        return {"type": "NUMBER"}
+    return {"type": "STRING"}  # str, EmailStr, dates
+
+
+def schema_from_model(model: type, exclude: tuple = ()) -> dict:
+    """Gemini response schema for a pydantic model; `exclude` names fields (at any depth) we compute ourselves."""
+    fields = {name: field for name, field in model.model_fields.items() if name not in exclude}
+    schema = {"type": "OBJECT", "properties": {name: _schema_for(field.annotation, exclude) for name, field in fields.items()}}
+    required = [name for name, field in fields.items() if field.is_required()]
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def _score_entry_schema(field_list: list) -> dict:
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "field_scores": {
+                "type": "OBJECT",
+                "properties": {field: {"type": "NUMBER"} for field in field_list},
+                "required": list(field_list),
+            },
+            **{name: _STRING_LIST for name in _SCORE_LISTS},
+        },
+        "required": ["field_scores", *_SCORE_LISTS],
+    }
+
+
+def score_response_schema(field_list: list) -> Optional[dict]:
+    """Schema of a generate_score answer for the JD's (dynamic) fields."""
+    if not field_list:
+        return None  # an OBJECT without properties is rejected by the API
+    return _score_entry_schema(field_list)
+
+
+def batch_score_response_schema(field_list: list) -> Optional[dict]:
+    if not field_list:
+        return None
+    entry = _score_entry_schema(field_list)
+    entry["properties"] = {"candidate": {"type": "INTEGER"}, **entry["properties"]}
+    entry["required"] = ["candidate", *entry["required"]]
+    return {
+        "type": "OBJECT",
+        "properties": {"results": {"type": "ARRAY", "items": entry}},
+        "required": ["results"],
+    }
+
+
+# ----------------- JSON repair -----------------
+def repair_json(raw: str) -> Optional[Any]:
+    """
+    Best-effort parse of almost-JSON from an LLM: prose around the object,
+    trailing commas (outside strings), or an answer cut off mid-way: closed
+    after the last complete element. A value the cut may have shortened
+    (a string, a number, true/false/null, a key) is dropped, never kept:
+    "8" out of a cut-off "85" would look like a valid score.
+    None when nothing usable is left.
+    """
+    starts = [pos for pos in (raw.find("{"), raw.find("[")) if pos >= 0]
+    if not starts:
+        return None
+
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = escaped = complete = False
+    trailing_comma = None  # position in `out` of a comma followed only by whitespace so far
+    for ch in raw[min(starts):]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in "}]" and trailing_comma is not None:
+            del out[trailing_comma:]  # [1, 2, ] → [1, 2]
+        if not ch.isspace():
+            trailing_comma = None
+        out.append(ch)
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                complete = True  # complete value: ignore whatever follows
+                break
+        elif ch == ",":
+            trailing_comma = len(out) - 1
+            cuts.append((trailing_comma, "".join(reversed(stack))))
+
+    text = "".join(out).rstrip()
+    candidates = []
+    if complete:
+        candidates.append(text)
+    elif not in_string and text[-1:] in ('"', "{", "[", "}", "]", ","):
+        # cut right after a token that can't have been shortened
+        candidates.append(text.rstrip(",") + "".join(reversed(stack)))
+    candidates += [text[:pos] + closing for pos, closing in reversed(cuts[-_MAX_REPAIR_CUTS:])]
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, (dict, list)):
+            return parsed
+    return None
+
+
+# ----------------- Partial validation -----------------
+def _empty_for(annotation) -> Any:
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return []
+    if origin in (Union, pytypes.UnionType):
+        return None
+    return ""
+
+
+def _repair_item(item_type, value) -> Any:
+    """One list element: valid as is, patched (missing keys filled with empty values), or None to drop it."""
+    adapter = TypeAdapter(item_type)
+    try:
+        return adapter.validate_python(value)
+    except ValidationError:
+        pass
+
+    if isinstance(item_type, type) and issubclass(item_type, BaseModel) and isinstance(value, dict):
+        if not any(value.get(name) not in (None, "", []) for name in item_type.model_fields):
+            return None  # nothing of this model in it
+        patched = dict(value)
+        for name, field in item_type.model_fields.items():
+            current = patched.get(name)
+            if current is None and field.is_required():
+                patched[name] = _empty_for(field.annotation)
+            elif get_origin(field.annotation) in (list, List) and isinstance(current, str):
+                patched[name] = [current]
+            elif field.annotation is str and isinstance(current, (int, float)):
+                patched[name] = str(current)  # "year": 2020
+        try:
+            return adapter.validate_python(patched)
+        except ValidationError:
+            return None
+
+    if item_type is str and isinstance(value, (int, float)):
+        return str(value)
+    return None
+
+
+def validate_partial(model: type, data: Any) -> Tuple[dict, List[str]]:
+    """
+    Validate `data` field by field instead of all-or-nothing: invalid list
+    elements are patched or dropped, other invalid fields fall back to their
+    default. Returns (model_dump, names of fields that lost data).
+    """
+    if not isinstance(data, dict):
+        return model().model_dump(), list(model.model_fields)
+
+    kept: Dict[str, Any] = {}
+    lost: List[str] = []
+    for name, field in model.model_fields.items():
+        if name not in data:
+            continue
+        value = data[name]
+        try:
+            kept[name] = TypeAdapter(field.annotation).validate_python(value)
+            continue
+        except ValidationError:
+            pass
+
+        if get_origin(field.annotation) in (list, List):
+            items = value if isinstance(value, list) else [value]
+            item_type = (get_args(field.annotation) or (str,))[0]
+            repaired = [_repair_item(item_type, item) for item in items]
+            kept[name] = [item for item in repaired if item is not None]
+            if len(kept[name]) < len(items):
+                lost.append(name)
+        else:
+            lost.append(name)
+
+    return model.model_validate(kept).model_dump(), lost
+
+
+def _as_score(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return max(0.0, min(100.0, float(value)))
+    if isinstance(value, str):
+        match = _NUMBER_RE.search(value)  # "85", "85%", "85/100"
+        if match:
+            return max(0.0, min(100.0, float(match.group())))
+    return None
+
+
+def _as_string_list(value) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, list):
+        return [str(item) for item in value if item not in (None, "") and not isinstance(item, (dict, list))]
+    return []
+
+
+def repair_score_result(result: dict, field_list: list) -> Tuple[dict, List[str]]:
+    """
+    Normalize a generate_score answer in place of zeroing it: scores become
+    floats in 0-100 ("85%" → 85.0), list fields become lists of strings.
+    JD fields the answer has no usable score for get 0.0 and are returned.
+    """
+    raw_scores = result.get("field_scores")
+    raw_scores = raw_scores if isinstance(raw_scores, dict) else {}
+
+    field_scores = {}
+    missing = []
+    for field in field_list:
+        score = _as_score(raw_scores.get(field))
+        if score is None:
+            missing.append(field)
+            score = 0.0
+        field_scores[field] = score
+    # extra fields the model invented are kept only if usable
+    for field, value in raw_scores.items():
+        if field not in field_scores and _as_score(value) is not None:
+            field_scores[field] = _as_score(value)
+
+    result["field_scores"] = field_scores
+    for name in _SCORE_LISTS:
+        result[name] = _as_string_list(result.get(name))
+    return result, missing
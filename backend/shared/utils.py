@@ -153,7 +153,11 @@ from dotenv import load_dotenv
 # Load env once
 load_dotenv()
 
+from contextlib import contextmanager
 from google import genai
+from backend.shared.genai_clients import genai_clients
+from backend.shared.ratelimit import estimate_tokens, is_rate_limited, llm_rate_limiter, parse_retry_after
+from backend.shared.structured import generation_config, repair_json
 
 # Load env once
 load_dotenv()
@@ -166,89 +170,197 @@ if os.getenv("GEMINI_API_KEY"):
         _GLOBAL_CLIENT = None
 
 
-def call_llm(prompt: str, model: str = "gemini-2.5-flash", *, api_key: str = None, max_retries: int = 3, backoff_factor: float = 1.0) -> dict:
+def _strip_markdown(s: str) -> str:
+    s = s.strip()
+    if s.startswith("```json"):
+        s = s[len("```json"):].strip()
+    if s.startswith("```"):
+        s = s[len("```"):].strip()
+    if s.endswith("```"):
+        s = s[:-len("```")].strip()
+    return s
+
+
+@contextmanager
+def _get_llm_client(api_key: str = None):
+    # choose client: prefer provided api_key (pooled per key), else global client
+    if api_key:
+        with genai_clients.lease(api_key) as client:
+            yield client
+        return
+
+    if _GLOBAL_CLIENT is None:
+        raise RuntimeError("No LLM client available. Provide an API key from the frontend or set GEMINI_API_KEY in env")
+    yield _GLOBAL_CLIENT
+
+
+def _parse_llm_response(response) -> dict:
+    """Turn an SDK response into parsed JSON or a structured error dict."""
+    # response.text is None when the answer was blocked or had no text part
+    raw_output = _strip_markdown(response.text or "")
+
+    # If the SDK surfaces an error structure, try to detect it
+    # e.g., some clients may include status/code in attributes
+    if hasattr(response, "status") and response.status >= 400:
+        msg = getattr(response, "message", getattr(response, "status_text", "LLM returned error"))
+        return {"error": {"message": str(msg), "code": int(getattr(response, "status", 0)), "type": "llm_error"}}
+
+    # Parse JSON safely
+    try:
+        return json.loads(raw_output)
+    except json.JSONDecodeError:
+        pass
+
+    # ✅ Truncated / slightly malformed JSON: keep what is complete instead of wasting the call
+    repaired = repair_json(raw_output)
+    if repaired is not None:
+        print("🩹 Repaired malformed JSON in LLM response")
+        return repaired
+
+    # Return the raw string inside an error structure so callers can log it
+    return {"error": {"message": "LLM returned non-JSON response", "raw": raw_output, "type": "llm_error"}}
+
+
+def _is_retryable(err_str: str) -> bool:
+    # Basic heuristic: retry on 429 / 502 / 503 / connection issues
+    return any(code in err_str for code in ["429", "502", "503", "504"]) or "timed out" in err_str.lower() or "overloaded" in err_str.lower()
+
+
+def _llm_error_from_exception(err_str: str) -> dict:
+    code = None
+    # Try to extract numeric code
+    m = re.search(r"(\b\d{3}\b)", err_str)
+    if m:
+        try:
+            code = int(m.group(1))
+        except Exception:
+            code = None
+
+    return {"error": {"message": err_str, "code": code, "type": "llm_error"}}
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None) if usage is not None else None
+    return total if isinstance(total, int) else None
+
+
+def _throttle_after_error(limiter, err_str: str, attempt: int, backoff_factor: float) -> float:
+    """
+    Feed a failed call back into the key's rate limiter.
+    Returns how long this caller should still sleep itself (0 when the
+    limiter already holds every caller of the key for the retry-after hint).
+    """
+    if is_rate_limited(err_str):
+        retry_after = parse_retry_after(err_str)
+        limiter.penalize(retry_after if retry_after is not None else _backoff_delay(attempt, backoff_factor))
+        return 0.0
+    return _backoff_delay(attempt, backoff_factor)
+
+
+def _backoff_delay(attempt: int, backoff_factor: float) -> float:
+    import random
+
+    sleep = backoff_factor * (2 ** (attempt - 1))
+    return sleep * (0.5 + random.random() * 0.5)  # add jitter between 50%-100%
+
+
+def call_llm(prompt: str, model: str = "gemini-2.5-flash", *, api_key: str = None, response_schema: dict = None, max_retries: int = 3, backoff_factor: float = 1.0) -> dict:
     """
     Robust wrapper to call Gemini (or compatible) LLM clients.
 
     Behavior:
-    - Retries transient errors with exponential backoff + jitter.
+    - Waits for the API key's RPM / TPM budget (see ratelimit.py) before each attempt.
+    - Asks for a JSON answer (shaped by `response_schema` when given, see
+      structured.py); almost-JSON answers are repaired rather than dropped.
+    - Retries transient errors with exponential backoff + jitter; a 429 pauses
+      every caller of the key for the server's retry-after hint.
     - Returns a dict on success (parsed JSON) or a structured error dict on failure:
         {"error": {"message": str, "code": optional_int, "type": "llm_error"}}
 
     Callers should check for the presence of the top-level "error" key.
+    Blocks the calling thread; inside async handlers use call_llm_async.
     """
 
     import time
-    import random
 
-    def _strip_markdown(s: str) -> str:
-        s = s.strip()
-        if s.startswith("```json"):
-            s = s[len("```json"):].strip()
-        if s.startswith("```"):
-            s = s[len("```"):].strip()
-        if s.endswith("```"):
-            s = s[:-len("```")].strip()
-        return s
+    limiter = llm_rate_limiter.get(api_key, model)
+    tokens = estimate_tokens(prompt)
+    config = generation_config(response_schema)
 
     last_exc = None
     for attempt in range(1, max_retries + 1):
         try:
-            # choose client: prefer provided api_key, else global client
-            if api_key:
-                client = genai.Client(api_key=api_key)
-            else:
-                client = _GLOBAL_CLIENT
-
-            if client is None:
-                raise RuntimeError("No LLM client available. Provide an API key from the frontend or set GEMINI_API_KEY in env")
-
-            response = client.models.generate_content(
-                model=model,
-                contents=[{"parts": [{"text": prompt}]}]
-            )
-
-            raw_output = _strip_markdown(response.text)
-
-            # If the SDK surfaces an error structure, try to detect it
-            # e.g., some clients may include status/code in attributes
-            if hasattr(response, "status") and response.status >= 400:
-                msg = getattr(response, "message", getattr(response, "status_text", "LLM returned error"))
-                return {"error": {"message": str(msg), "code": int(getattr(response, "status", 0)), "type": "llm_error"}}
-
-            # Parse JSON safely
-            try:
-                return json.loads(raw_output)
-            except json.JSONDecodeError:
-                # Return the raw string inside an error structure so callers can log it
-                return {"error": {"message": "LLM returned non-JSON response", "raw": raw_output, "type": "llm_error"}}
+            # ✅ Wait for this key's RPM / TPM budget instead of firing and eating a 429
+            limiter.acquire_sync(tokens)
+            with _get_llm_client(api_key) as client:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=[{"parts": [{"text": prompt}]}],
+                    config=config
+                )
+            limiter.record_usage(tokens, _usage_tokens(response))
+            return _parse_llm_response(response)
 
         except Exception as e:
             # If the exception appears transient (network/503), retry with backoff
             last_exc = e
             err_str = str(e)
-            # Basic heuristic: retry on 429 / 502 / 503 / connection issues
-            retryable = any(code in err_str for code in ["429", "502", "503", "504"]) or "timed out" in err_str.lower() or "overloaded" in err_str.lower()
             print(f"[LLM ERROR] attempt {attempt}/{max_retries}: {e}")
 
-            if attempt == max_retries or not retryable:
+            # every 429 reaches the limiter, the last attempt's too
+            delay = _throttle_after_error(limiter, err_str, attempt, backoff_factor)
+            if attempt == max_retries or not _is_retryable(err_str):
                 # Return structured error
-                code = None
-                # Try to extract numeric code
-                import re
-                m = re.search(r"(\b\d{3}\b)", err_str)
-                if m:
-                    try:
-                        code = int(m.group(1))
-                    except Exception:
-                        code = None
-
-                return {"error": {"message": err_str, "code": code, "type": "llm_error"}}
-
-            # Backoff with jitter
-            sleep = backoff_factor * (2 ** (attempt - 1))
-            sleep = sleep * (0.5 + random.random() * 0.5)  # add jitter between 50%-100%
-            time.sleep(sleep)
+                return _llm_error_from_exception(err_str)
+
+            if delay:
+                time.sleep(delay)
+
+    # Fallback structured error if loop exits unexpectedly
+    return {"error": {"message": str(last_exc), "type": "llm_error"}}
+
+
+async def call_llm_async(prompt: str, model: str = "gemini-2.5-flash", *, api_key: str = None, response_schema: dict = None, max_retries: int = 3, backoff_factor: float = 1.0) -> dict:
+    """
+    asyncio version of call_llm built on the SDK's `client.aio` surface.
+
+    Same return contract as call_llm, but waits on the network and on
+    backoff without blocking the event loop, so many requests can be in
+    flight from one uvicorn worker.
+    """
+
+    import asyncio
+
+    limiter = llm_rate_limiter.get(api_key, model)
+    tokens = estimate_tokens(prompt)
+    config = generation_config(response_schema)
+
+    last_exc = None
+    for attempt in range(1, max_retries + 1):
+        try:
+            # ✅ Fair FIFO wait for this key's RPM / TPM budget (shared by all requests using the key)
+            await limiter.acquire(tokens)
+            with _get_llm_client(api_key) as client:
+                response = await client.aio.models.generate_content(
+                    model=model,
+                    contents=[{"parts": [{"text": prompt}]}],
+                    config=config
+                )
+            limiter.record_usage(tokens, _usage_tokens(response))
+            return _parse_llm_response(response)
+
+        except Exception as e:
+            last_exc = e
+            err_str = str(e)
+            print(f"[LLM ERROR] attempt {attempt}/{max_retries}: {e}")
+
+            delay = _throttle_after_error(limiter, err_str, attempt, backoff_factor)
+            if attempt == max_retries or not _is_retryable(err_str):
+                return _llm_error_from_exception(err_str)
+
+            if delay:
+                await asyncio.sleep(delay)
 
     # Fallback structured error if loop exits unexpectedly
     return {"error": {"message": str(last_exc), "type": "llm_error"}}
@@ -260,7 +372,15 @@ from datetime import datetime
 from typing import Dict, Any
 
 
-def build_evaluation(scored_result: Dict[str, Any], jd_json: Dict[str, Any]) -> Dict[str, Any]:
+def build_evaluation(
+    scored_result: Dict[str, Any],
+    jd_json: Dict[str, Any],
+    *,
+    model: str = None,
+    jd_fingerprint: str = None,
+    resume_fingerprint: str = None
+) -> Dict[str, Any]:
+    # fingerprints + model let a later run recognise this evaluation as still current
     return {
         "jd_id": jd_json.get("id") or jd_json.get("title"),
         "jd_title": jd_json.get("title", ""),
@@ -270,8 +390,10 @@ def build_evaluation(scored_result: Dict[str, Any], jd_json: Dict[str, Any]) ->
         "missing_skills": scored_result.get("missing_skills", []),
         "other_skills": scored_result.get("other_skills", []),
         "scoring_breakdown": scored_result.get("field_scores", {}),
-        "evaluated_at":datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-
+        "evaluated_at":datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "model": model,
+        "jd_fingerprint": jd_fingerprint,
+        "resume_fingerprint": resume_fingerprint,
     }
 
 # scoring helper 
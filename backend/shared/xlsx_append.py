@@ -0,0 +1,422 @@
+"""
+Append rows to an existing .xlsx without loading it.
+
+An .xlsx file is a zip of XML parts. Instead of load_workbook → mutate →
+save (which parses and re-serializes every historical row of every sheet),
+new rows are spliced into the target sheet's XML while it is streamed into
+a sidecar copy of the archive, which then atomically replaces the original.
+Historical rows are never parsed, other parts are copied as-is, and new
+cells use inline strings so sharedStrings.xml is never touched.
+
+Anything unexpected in the file raises XlsxSpliceError; callers fall back
+to openpyxl.
+"""
+import os
+import re
+import uuid
+import shutil
+import threading
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Sequence
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import range_boundaries
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+WORKSHEET_REL_TYPE = REL_NS + "/worksheet"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+CHUNK_SIZE = 1 << 20
+INVALID_TITLE_RE = re.compile(r"[\\*?:/\[\]]")
+
+_ROW_NUMBER_RE = re.compile(rb"<row\b[^>]*?\sr=\"(\d+)\"")
+_SHEET_DATA_OPEN = b"<sheetData"
+_SHEET_DATA_CLOSE = b"</sheetData>"
+
+# one writer per file at a time (appends are read-modify-replace)
+_FILE_LOCKS: Dict[str, threading.Lock] = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+
+class XlsxSpliceError(Exception):
+    """The workbook layout is not one the splicer understands."""
+
+
+def _file_lock(path: str) -> threading.Lock:
+    key = os.path.realpath(path)
+    with _FILE_LOCKS_GUARD:
+        return _FILE_LOCKS.setdefault(key, threading.Lock())
+
+
+# ----------------- Cell / row XML -----------------
+def _cell_xml(ref: str, value, style: int) -> str:
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and value == value and value not in (float("inf"), float("-inf")):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(ILLEGAL_CHARACTERS_RE.sub("", str(value)))
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def rows_xml(rows: Sequence[Sequence], first_row: int, style: int) -> bytes:
+    letters = [get_column_letter(col) for col in range(1, max((len(r) for r in rows), default=0) + 1)]
+    parts = []
+    for offset, row in enumerate(rows):
+        r = first_row + offset
+        cells = "".join(_cell_xml(f"{letters[col]}{r}", value, style) for col, value in enumerate(row))
+        parts.append(f'<row r="{r}">{cells}</row>')
+    return "".join(parts).encode("utf-8")
+
+
+def _cols_xml(widths: Sequence[float]) -> str:
+    return "<cols>" + "".join(
+        f'<col min="{col}" max="{col}" width="{width}" customWidth="1"/>'
+        for col, width in enumerate(widths, start=1)
+    ) + "</cols>"
+
+
+# ----------------- Package parts -----------------
+def _sheet_parts(zin: zipfile.ZipFile) -> Dict[str, str]:
+    """Sheet name → zip member name of its worksheet XML."""
+    try:
+        workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+        rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    except (KeyError, ET.ParseError) as e:
+        raise XlsxSpliceError(f"Unreadable workbook parts: {e}")
+
+    targets = {}
+    for rel in rels.findall(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            member = target.lstrip("/")
+        else:
+            member = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = member
+
+    parts = {}
+    for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+        member = targets.get(sheet.get(f"{{{REL_NS}}}id"))
+        if member:
+            parts[sheet.get("name")] = member
+    return parts
+
+
+def _xf_fragment(styles: str, tag: str):
+    match = re.search(rf"<{tag}\b[^>]*>(.*?)</{tag}>", styles, re.S)
+    if not match:
+        raise XlsxSpliceError(f"styles.xml has no <{tag}>")
+    try:
+        items = list(ET.fromstring(f"<root>{match.group(1)}</root>"))
+    except ET.ParseError as e:
+        raise XlsxSpliceError(f"Unreadable <{tag}>: {e}")
+    return match, items
+
+
+def _append_to_collection(styles: str, tag: str, element: str, count: int) -> str:
+    match = re.search(rf"<{tag}\b[^>]*>(.*?)</{tag}>", styles, re.S)
+    opening = re.sub(r'count="\d+"', f'count="{count}"', styles[match.start():match.start(1)])
+    if 'count="' not in opening:
+        opening = opening[:-1] + f' count="{count}">'
+    return styles[:match.start()] + opening + match.group(1) + element + f"</{tag}>" + styles[match.end():]
+
+
+def ensure_wrap_style(styles: str, bold: bool = False):
+    """
+    Index of a cellXfs entry with wrap + top alignment (optionally bold),
+    adding the font / xf when the workbook has none. Returns (styles, index).
+    """
+    _, fonts = _xf_fragment(styles, "fonts")
+    font_id = 0
+    if bold:
+        font_id = next(
+            (i for i, f in enumerate(fonts)
+             if f.find("b") is not None and f.find("b").get("val", "1") in ("1", "true")),
+            None
+        )
+        if font_id is None:
+            styles = _append_to_collection(styles, "fonts", '<font><b val="1"/></font>', len(fonts) + 1)
+            font_id = len(fonts)
+
+    _, xfs = _xf_fragment(styles, "cellXfs")
+    for idx, xf in enumerate(xfs):
+        align = xf.find("alignment")
+        if (
+            xf.get("fontId", "0") == str(font_id)
+            and xf.get("numFmtId", "0") == "0"
+            and xf.get("fillId", "0") == "0"
+            and xf.get("borderId", "0") == "0"
+            and align is not None
+            and align.get("wrapText") in ("1", "true")
+            and align.get("vertical") == "top"
+        ):
+            return styles, idx
+
+    apply_font = ' applyFont="1"' if bold else ""
+    xf = (
+        f'<xf numFmtId="0" fontId="{font_id}" fillId="0" borderId="0" xfId="0" applyAlignment="1"{apply_font}>'
+        '<alignment vertical="top" wrapText="1"/></xf>'
+    )
+    return _append_to_collection(styles, "cellXfs", xf, len(xfs) + 1), len(xfs)
+
+
+# ----------------- Sheet splicing -----------------
+def _last_row(zin: zipfile.ZipFile, member: str) -> int:
+    """Highest row number in a worksheet, scanning the XML as bytes (no parsing)."""
+    last = 0
+    carry = b""
+    with zin.open(member) as src:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = carry + chunk
+            for match in _ROW_NUMBER_RE.finditer(data):
+                last = max(last, int(match.group(1)))
+            carry = data[-256:]
+    if last == 0:
+        with zin.open(member) as src:
+            if b"<row" in src.read(CHUNK_SIZE):
+                raise XlsxSpliceError("Rows without row numbers")
+    return last
+
+
+def _widen_cols(head: str, widths: Sequence[float]) -> str:
+    """Grow single-column <col> widths to at least `widths`; add missing columns."""
+    match = re.search(r"<cols>(.*?)</cols>", head, re.S)
+    if not match:
+        return head.replace("<sheetData", _cols_xml(widths) + "<sheetData", 1)
+
+    cols = []
+    for col in re.findall(r"<col\b[^>]*/>", match.group(1)):
+        lo = int(re.search(r'\bmin="(\d+)"', col).group(1))
+        hi = int(re.search(r'\bmax="(\d+)"', col).group(1))
+        if lo == hi and lo <= len(widths):
+            width = re.search(r'\bwidth="([\d.]+)"', col)
+            current = float(width.group(1)) if width else 0.0
+            if widths[lo - 1] > current:
+                if width:
+                    col = col[:width.start(1)] + str(widths[lo - 1]) + col[width.end(1):]
+                else:
+                    col = col[:-2] + f' width="{widths[lo - 1]}" customWidth="1"/>'
+        cols.append((lo, hi, col))
+
+    for idx, width in enumerate(widths, start=1):
+        if not any(lo <= idx <= hi for lo, hi, _ in cols):
+            cols.append((idx, idx, f'<col min="{idx}" max="{idx}" width="{width}" customWidth="1"/>'))
+    cols.sort()
+    return head[:match.start()] + "<cols>" + "".join(c for _, _, c in cols) + "</cols>" + head[match.end():]
+
+
+def _update_dimension(head: str, last_row: int, last_col: int) -> str:
+    match = re.search(r'<dimension ref="([^"]+)"\s*/>', head)
+    if not match:
+        return head
+    try:
+        min_col, min_row, max_col, _ = range_boundaries(match.group(1))
+    except ValueError:
+        min_col, min_row, max_col = 1, 1, last_col
+    ref = f"{get_column_letter(min_col or 1)}{min_row or 1}:{get_column_letter(max(max_col or 1, last_col))}{last_row}"
+    return head[:match.start()] + f'<dimension ref="{ref}"/>' + head[match.end():]
+
+
+def _splice_rows(src, dst, new_rows: bytes, last_row: int, last_col: int, widths: Sequence[float]) -> None:
+    """Stream a worksheet from src to dst, inserting new_rows at the end of <sheetData>."""
+    # head (sheetViews, cols, dimension…) is small: edit it as text
+    buf = b""
+    while _SHEET_DATA_OPEN not in buf:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            raise XlsxSpliceError("Worksheet has no <sheetData>")
+        buf += chunk
+    pos = buf.index(_SHEET_DATA_OPEN)
+    head = buf[:pos].decode("utf-8") + "<sheetData"
+    head = _update_dimension(_widen_cols(head, widths), last_row, last_col)
+    dst.write(head[:-len("<sheetData")].encode("utf-8"))
+    buf = buf[pos:]
+
+    if buf.startswith(b"<sheetData/>"):
+        dst.write(b"<sheetData>" + new_rows + _SHEET_DATA_CLOSE)
+        dst.write(buf[len(b"<sheetData/>"):])
+    else:
+        keep = len(_SHEET_DATA_CLOSE) - 1
+        while _SHEET_DATA_CLOSE not in buf:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                raise XlsxSpliceError("Worksheet has no </sheetData>")
+            dst.write(buf[:-keep])
+            buf = buf[-keep:] + chunk
+        end = buf.index(_SHEET_DATA_CLOSE)
+        dst.write(buf[:end])
+        dst.write(new_rows)
+        dst.write(buf[end:])
+
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _new_sheet_xml(header: Sequence, rows: Sequence[Sequence], widths: Sequence[float], header_style: int, style: int) -> bytes:
+    last_row = len(rows) + 1
+    head = (
+        f'<worksheet xmlns="{MAIN_NS}">'
+        f'<dimension ref="A1:{get_column_letter(len(header))}{last_row}"/>'
+        '<sheetViews><sheetView workbookViewId="0">'
+        '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+        '<selection pane="bottomLeft" activeCell="A2" sqref="A2"/>'
+        '</sheetView></sheetViews>'
+        '<sheetFormatPr defaultRowHeight="15"/>'
+        f'{_cols_xml(widths)}<sheetData>'
+    ).encode("utf-8")
+    tail = (
+        '</sheetData>'
+        '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+        '</worksheet>'
+    ).encode("utf-8")
+    return head + rows_xml([header], 1, header_style) + rows_xml(rows, 2, style) + tail
+
+
+# ----------------- Archive rewrite -----------------
+def _rewrite_archive(
+    file_path: str,
+    transforms: Dict[str, Callable],
+    additions: Dict[str, bytes] = None,
+) -> None:
+    """
+    Copy the archive into a sidecar file, passing members named in
+    `transforms` through fn(src, dst); then atomically replace the original.
+    """
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with zipfile.ZipFile(file_path) as zin, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.compress_type = zipfile.ZIP_DEFLATED
+                out_info.external_attr = info.external_attr
+                big = info.file_size > (1 << 30)
+                with zin.open(info) as src, zout.open(out_info, "w", force_zip64=big) as dst:
+                    transform = transforms.get(info.filename)
+                    if transform:
+                        transform(src, dst)
+                    else:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            for name, data in (additions or {}).items():
+                zout.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _replace_text(new_text: str) -> Callable:
+    def transform(src, dst):
+        dst.write(new_text.encode("utf-8"))
+    return transform
+
+
+def append_rows(file_path: str, sheet_name: str, rows: List[list], widths: Sequence[float]) -> int:
+    """
+    Append rows at the bottom of an existing sheet. Only that sheet's XML
+    (streamed) and styles.xml (if a style must be added) change.
+    Returns the number of rows appended.
+    """
+    with _file_lock(file_path):
+        with zipfile.ZipFile(file_path) as zin:
+            parts = _sheet_parts(zin)
+            if sheet_name not in parts:
+                raise ValueError(f"Sheet '{sheet_name}' not found in file.")
+            member = parts[sheet_name]
+            last_row = _last_row(zin, member)
+            try:
+                styles_before = zin.read("xl/styles.xml").decode("utf-8")
+            except KeyError:
+                raise XlsxSpliceError("Workbook has no styles.xml")
+
+        styles, style = ensure_wrap_style(styles_before)
+        new_rows = rows_xml(rows, last_row + 1, style)
+        last_col = max((len(r) for r in rows), default=1)
+        new_last_row = last_row + len(rows)
+
+        transforms = {
+            member: lambda src, dst: _splice_rows(src, dst, new_rows, new_last_row, last_col, widths),
+        }
+        if styles != styles_before:
+            transforms["xl/styles.xml"] = _replace_text(styles)
+        _rewrite_archive(file_path, transforms)
+    return len(rows)
+
+
+def add_sheet(file_path: str, sheet_name: str, header: Sequence, rows: List[list], widths: Sequence[float]) -> int:
+    """
+    Add a new sheet (header + rows) to an existing workbook without
+    re-serializing the existing sheets. Returns the number of data rows.
+    """
+    if not sheet_name or len(sheet_name) > 31 or INVALID_TITLE_RE.search(sheet_name):
+        raise ValueError(f"Invalid sheet name '{sheet_name}'.")
+
+    with _file_lock(file_path):
+        with zipfile.ZipFile(file_path) as zin:
+            parts = _sheet_parts(zin)
+            if sheet_name.lower() in (name.lower() for name in parts):
+                raise ValueError(f"Sheet '{sheet_name}' already exists.")
+            names = set(zin.namelist())
+            try:
+                workbook = zin.read("xl/workbook.xml").decode("utf-8")
+                rels = zin.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+                content_types = zin.read("[Content_Types].xml").decode("utf-8")
+                styles_before = zin.read("xl/styles.xml").decode("utf-8")
+            except KeyError as e:
+                raise XlsxSpliceError(f"Missing workbook part: {e}")
+
+        if "</sheets>" not in workbook or "</Relationships>" not in rels or "</Types>" not in content_types:
+            raise XlsxSpliceError("Unexpected workbook layout")
+
+        styles, header_style = ensure_wrap_style(styles_before, bold=True)
+        styles, style = ensure_wrap_style(styles)
+
+        number = 1
+        while f"xl/worksheets/sheet{number}.xml" in names:
+            number += 1
+        member = f"xl/worksheets/sheet{number}.xml"
+
+        used_ids = set(re.findall(r'\bId="([^"]+)"', rels))
+        rel_number = len(used_ids) + 1
+        while f"rId{rel_number}" in used_ids:
+            rel_number += 1
+        rel_id = f"rId{rel_number}"
+
+        sheet_ids = [int(x) for x in re.findall(r'<sheet\b[^>]*\bsheetId="(\d+)"', workbook)]
+        sheet_id = max(sheet_ids, default=0) + 1
+
+        workbook = workbook.replace(
+            "</sheets>",
+            f'<sheet xmlns:r="{REL_NS}" name={quoteattr(sheet_name)} sheetId="{sheet_id}" state="visible" r:id="{rel_id}"/></sheets>',
+            1
+        )
+        rels = rels.replace(
+            "</Relationships>",
+            f'<Relationship Type="{WORKSHEET_REL_TYPE}" Target="/{member}" Id="{rel_id}"/></Relationships>',
+            1
+        )
+        content_types = content_types.replace(
+            "</Types>",
+            f'<Override PartName="/{member}" ContentType="{WORKSHEET_CONTENT_TYPE}"/></Types>',
+            1
+        )
+
+        transforms = {
+            "xl/workbook.xml": _replace_text(workbook),
+            "xl/_rels/workbook.xml.rels": _replace_text(rels),
+            "[Content_Types].xml": _replace_text(content_types),
+        }
+        if styles != styles_before:
+            transforms["xl/styles.xml"] = _replace_text(styles)
+
+        sheet_xml = _new_sheet_xml(header, rows, widths, header_style, style)
+        _rewrite_archive(file_path, transforms, {member: sheet_xml})
+    return len(rows)
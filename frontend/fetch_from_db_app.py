@@ -1,12 +1,10 @@
 
 from logging import PlaceHolder
-import os
-import base64
 import requests
 import streamlit as st
 import re
 import pymongo
-from utils import force_rerun, safe_rerun
+from utils import fetch_export_bytes, fetch_results_page, force_rerun, results_controls, safe_rerun
 
 # def reset_fetch_state():
 #     keys_to_clear = [
@@ -38,6 +36,7 @@ def reset_fetch_state():
     st.session_state.fetch_evaluation_done = False
     st.session_state.fetch_evaluation_response = None
     st.session_state.fetch_results = None
+    st.session_state.fetch_result_id = None
     st.session_state.fetch_excel_file = None
     st.session_state.fetch_jd_data = None
     st.session_state.fetch_save_mode = None
@@ -437,11 +436,16 @@ def app():
             response = st.session_state.fetch_evaluation_response
             if response.status_code == 200:
                 result_json = response.json()
+                # only the first page comes back; further pages and exports go through result_id
                 st.session_state.fetch_results = result_json.get("data", [])
+                st.session_state.fetch_result_id = result_json.get("result_id")
                 jd_mode = result_json.get("jd_mode", "disabled")
 
                 if jd_mode == "enabled":
                     st.success("✅ Evaluation completed with JD scoring!")
+                    counts = result_json.get("evaluations") or {}
+                    if counts.get("reused"):
+                        st.info(f"♻️ {counts['reused']} candidate(s) reused from earlier runs, {counts['fresh']} newly scored.")
                 else:
                     st.success("✅ Resume parsing completed (no JD provided).")
 
@@ -486,12 +490,24 @@ def app():
                     return evaluations[-1].get("score", 0)
                 return 0
 
-            sorted_results = sorted(
-                st.session_state.fetch_results,
-                key=get_latest_score,
-                reverse=True
-            )
-            evaluated_count = len(sorted_results)
+            # ✅ Sorting / filtering / paging happen server-side when the set was stored
+            result_id = st.session_state.get("fetch_result_id")
+            page_json = None
+            if result_id:
+                sort_key, sort_order, filters = results_controls("fetch")
+                page_json = fetch_results_page(
+                    result_id, st.session_state.fetch_page, ITEMS_PER_PAGE, sort_key, sort_order, filters
+                )
+
+            if page_json:
+                sorted_results = None
+            else:
+                sorted_results = sorted(
+                    st.session_state.fetch_results,
+                    key=get_latest_score,
+                    reverse=True
+                )
+            evaluated_count = page_json.get("set_total", 0) if page_json else len(sorted_results)
 
             st.markdown(
                 f"""
@@ -512,12 +528,17 @@ def app():
                 unsafe_allow_html=True
             )
 
-            total_items = len(sorted_results)
-            total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+            if page_json:
+                total_items = page_json.get("total", 0)
+                total_pages = max(1, page_json.get("total_pages", 1))
+                page_results = page_json.get("data", [])
+            else:
+                total_items = len(sorted_results)
+                total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
 
-            start_idx = (st.session_state.fetch_page - 1) * ITEMS_PER_PAGE
-            end_idx = start_idx + ITEMS_PER_PAGE
-            page_results = sorted_results[start_idx:end_idx]
+                start_idx = (st.session_state.fetch_page - 1) * ITEMS_PER_PAGE
+                end_idx = start_idx + ITEMS_PER_PAGE
+                page_results = sorted_results[start_idx:end_idx]
             
 
             for resume in page_results:
@@ -780,7 +801,7 @@ def app():
 
                     if response.status_code == 200:
                         resp_json = response.json()
-                        if resp_json.get("status") == "success" and resp_json.get("excel_file"):
+                        if resp_json.get("status") == "success" and resp_json.get("download_url"):
                             st.session_state.fetch_excel_file = resp_json
                             st.success("✅ Export successful!")
                         else:
@@ -801,7 +822,7 @@ def app():
 
                 if st.button("Export New Excel", key="btn_export_new"):
                     params = {
-                        "processed_resumes": st.session_state.fetch_results,
+                        "result_id": st.session_state.fetch_result_id,
                         "mode": "new_file",
                         "file_path": file_name,
                         "sheet_name": sheet_name,
@@ -828,7 +849,7 @@ def app():
 
                         if selected_sheet and st.button("Append to Sheet", key="btn_append_sheet"):
                             params = {
-                                "processed_resumes": st.session_state.fetch_results,
+                                "result_id": st.session_state.fetch_result_id,
                                 "mode": "append_sheet",
                                 "file_path": selected_file,  # filename only, backend will add user folder
                                 "sheet_name": selected_sheet,
@@ -852,7 +873,7 @@ def app():
 
                         if new_sheet and st.button("Create New Sheet", key="btn_create_sheet"):
                             params = {
-                                "processed_resumes": st.session_state.fetch_results,
+                                "result_id": st.session_state.fetch_result_id,
                                 "mode": "new_sheet",
                                 "file_path": selected_file,  # filename only
                                 "sheet_name": new_sheet,
@@ -875,7 +896,7 @@ def app():
                         st.error("Please enter a valid MongoDB URL.")
                     else:
                         params = {
-                            "processed_resumes": st.session_state.fetch_results,
+                            "result_id": st.session_state.fetch_result_id,
                             "mongo_url": mongo_url,
                             "db_name": db_name,
                             "collection_name": collection_name,
@@ -904,16 +925,17 @@ def app():
             # --------------------------
             # 5️⃣  Download Button
             # --------------------------
-            if st.session_state.get("fetch_excel_file") and st.session_state.fetch_excel_file.get("excel_file"):
-                excel_b64 = st.session_state.fetch_excel_file["excel_file"]
-                excel_bytes = base64.b64decode(excel_b64)
-                saved_path = st.session_state.fetch_excel_file.get("saved_path", "resumes.xlsx")
-                st.download_button(
-                    label="Download Excel",
-                    data=excel_bytes,
-                    file_name=os.path.basename(saved_path),
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
+            if st.session_state.get("fetch_excel_file") and st.session_state.fetch_excel_file.get("download_url"):
+                excel_bytes = fetch_export_bytes(st.session_state.fetch_excel_file)
+                if excel_bytes is None:
+                    st.warning("❌ Could not download the exported file.")
+                else:
+                    st.download_button(
+                        label="Download Excel",
+                        data=excel_bytes,
+                        file_name=st.session_state.fetch_excel_file.get("file_name", "resumes.xlsx"),
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    )
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
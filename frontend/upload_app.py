@@ -1,8 +1,6 @@
-import os
-import base64
 import requests
 import streamlit as st
-from utils import force_rerun
+from utils import fetch_export_bytes, fetch_results_page, force_rerun, results_controls
 # def reset_upload_state():
 #     keys_to_clear = [
 #         "upload_step",
@@ -35,6 +33,7 @@ def reset_upload_state():
     st.session_state.upload_evaluation_done = False
     st.session_state.upload_evaluation_response = None
     st.session_state.upload_results = None
+    st.session_state.upload_result_id = None
     st.session_state.upload_excel_file = None
     st.session_state.upload_jd_data = None
     st.session_state.upload_save_mode = None
@@ -382,7 +381,9 @@ def app():
             response = st.session_state.upload_evaluation_response
             if response.status_code == 200:
                 result_json = response.json()
+                # only the first page comes back; further pages and exports go through result_id
                 st.session_state.upload_results = result_json.get("data", [])
+                st.session_state.upload_result_id = result_json.get("result_id")
                 jd_mode = result_json.get("jd_mode", "disabled")
 
                 if jd_mode == "enabled":
@@ -587,18 +588,35 @@ def app():
                     return evaluations[-1].get("score", 0)
                 return 0
 
-            sorted_results = sorted(
-                st.session_state.upload_results,
-                key=get_latest_score,
-                reverse=True
-            )
+            # ✅ Sorting / filtering / paging happen server-side when the set was stored
+            result_id = st.session_state.get("upload_result_id")
+            page_json = None
+            if result_id:
+                sort_key, sort_order, filters = results_controls("upload", page_key="page")
+                page_json = fetch_results_page(
+                    result_id, st.session_state.page, ITEMS_PER_PAGE, sort_key, sort_order, filters
+                )
 
-            total_items = len(sorted_results)
-            total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+            if page_json:
+                sorted_results = None
+            else:
+                sorted_results = sorted(
+                    st.session_state.upload_results,
+                    key=get_latest_score,
+                    reverse=True
+                )
 
-            start_idx = (st.session_state.page - 1) * ITEMS_PER_PAGE
-            end_idx = start_idx + ITEMS_PER_PAGE
-            page_results = sorted_results[start_idx:end_idx]
+            if page_json:
+                total_items = page_json.get("total", 0)
+                total_pages = max(1, page_json.get("total_pages", 1))
+                page_results = page_json.get("data", [])
+            else:
+                total_items = len(sorted_results)
+                total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+
+                start_idx = (st.session_state.page - 1) * ITEMS_PER_PAGE
+                end_idx = start_idx + ITEMS_PER_PAGE
+                page_results = sorted_results[start_idx:end_idx]
 
 
             # Display paginated resumes
@@ -841,7 +859,7 @@ def app():
 
                     if response.status_code == 200:
                         resp_json = response.json()
-                        if resp_json.get("status") == "success" and resp_json.get("excel_file"):
+                        if resp_json.get("status") == "success" and resp_json.get("download_url"):
                             st.session_state.upload_excel_file = resp_json
                             st.success("✅ Export successful!")
                         else:
@@ -862,7 +880,7 @@ def app():
 
                 if st.button("Export New Excel", key="btn_export_new"):
                     params = {
-                        "processed_resumes": st.session_state.upload_results,
+                        "result_id": st.session_state.upload_result_id,
                         "mode": "new_file",
                         "file_path": file_name,
                         "sheet_name": sheet_name,
@@ -889,7 +907,7 @@ def app():
 
                         if selected_sheet and st.button("Append to Sheet", key="btn_append_sheet"):
                             params = {
-                                "processed_resumes": st.session_state.upload_results,
+                                "result_id": st.session_state.upload_result_id,
                                 "mode": "append_sheet",
                                 "file_path": selected_file,  # filename only, backend will add user folder
                                 "sheet_name": selected_sheet,
@@ -913,7 +931,7 @@ def app():
 
                         if new_sheet and st.button("Create New Sheet", key="btn_create_sheet"):
                             params = {
-                                "processed_resumes": st.session_state.upload_results,
+                                "result_id": st.session_state.upload_result_id,
                                 "mode": "new_sheet",
                                 "file_path": selected_file,  # filename only
                                 "sheet_name": new_sheet,
@@ -936,7 +954,7 @@ def app():
                         st.error("Please enter a valid MongoDB URL.")
                     else:
                         params = {
-                            "processed_resumes": st.session_state.upload_results,
+                            "result_id": st.session_state.upload_result_id,
                             "mongo_url": mongo_url,
                             "db_name": db_name,
                             "collection_name": collection_name,
@@ -965,16 +983,17 @@ def app():
             # --------------------------
             # 5️⃣  Download Button
             # --------------------------
-            if st.session_state.get("upload_excel_file") and st.session_state.upload_excel_file.get("excel_file"):
-                excel_b64 = st.session_state.upload_excel_file["excel_file"]
-                excel_bytes = base64.b64decode(excel_b64)
-                saved_path = st.session_state.upload_excel_file.get("saved_path", "resumes.xlsx")
-                st.download_button(
-                    label="Download Excel",
-                    data=excel_bytes,
-                    file_name=os.path.basename(saved_path),
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
+            if st.session_state.get("upload_excel_file") and st.session_state.upload_excel_file.get("download_url"):
+                excel_bytes = fetch_export_bytes(st.session_state.upload_excel_file)
+                if excel_bytes is None:
+                    st.warning("❌ Could not download the exported file.")
+                else:
+                    st.download_button(
+                        label="Download Excel",
+                        data=excel_bytes,
+                        file_name=st.session_state.upload_excel_file.get("file_name", "resumes.xlsx"),
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    )
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import requests
 import streamlit as st
 
 def safe_rerun():
@@ -58,3 +59,89 @@ def force_rerun():
                         return
                 except Exception:
                     pass
+
+
+RESULT_SORT_OPTIONS = {
+    "Score": "score",
+    "Experience": "experience",
+    "Name": "name",
+    "Uploaded at": "uploaded_at",
+}
+
+
+def fetch_results_page(result_id, page, limit, sort="score", order="desc", filters=None):
+    """One sorted / filtered page of a server-side result set, or None if the backend can't serve it."""
+    headers = {}
+    if st.session_state.get("auth_token"):
+        headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
+
+    params = {"page": page, "limit": limit, "sort": sort, "order": order}
+    for key, value in (filters or {}).items():
+        if value not in (None, ""):
+            params[key] = value
+
+    try:
+        resp = requests.get(f"http://127.0.0.1:8000/results/{result_id}", params=params, headers=headers)
+        if resp.status_code == 200:
+            return resp.json()
+        print(f"Results page request failed: {resp.status_code} {resp.text}")
+    except Exception as e:
+        print(f"Results page request failed: {e}")
+    return None
+
+
+def results_controls(prefix, page_key=None):
+    """
+    Sort / filter widgets for the results list; any change goes back to page 1.
+    page_key: session_state key of the view's current page (default "<prefix>_page").
+    """
+    page_key = page_key or f"{prefix}_page"
+
+    def reset_page():
+        st.session_state[page_key] = 1
+
+    with st.expander("🔎 Sort & filter", expanded=False):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            sort_label = st.selectbox("Sort by", list(RESULT_SORT_OPTIONS), key=f"{prefix}_sort", on_change=reset_page)
+        with c2:
+            order = st.selectbox("Order", ["desc", "asc"], key=f"{prefix}_order", on_change=reset_page)
+        with c3:
+            min_score = st.number_input("Min score", 0.0, 100.0, 0.0, step=5.0, key=f"{prefix}_min_score", on_change=reset_page)
+
+        c4, c5, c6 = st.columns(3)
+        with c4:
+            matched_skill = st.text_input("Has matched skill", key=f"{prefix}_matched_skill", on_change=reset_page)
+        with c5:
+            missing_skill = st.text_input("Has missing skill", key=f"{prefix}_missing_skill", on_change=reset_page)
+        with c6:
+            location = st.text_input("Location", key=f"{prefix}_location", on_change=reset_page)
+
+    filters = {
+        "min_score": min_score or None,
+        "matched_skill": matched_skill.strip(),
+        "missing_skill": missing_skill.strip(),
+        "location": location.strip(),
+    }
+    return RESULT_SORT_OPTIONS[sort_label], order, filters
+
+
+def fetch_export_bytes(export_info):
+    """
+    Download a saved export once via its download_url and keep the bytes on
+    the export response, so reruns don't download it again.
+    """
+    if export_info.get("_bytes") is None:
+        headers = {}
+        if st.session_state.get("auth_token"):
+            headers["Authorization"] = f"Bearer {st.session_state.auth_token}"
+        try:
+            resp = requests.get(f"http://127.0.0.1:8000{export_info['download_url']}", headers=headers, stream=True, timeout=120)
+            if resp.status_code != 200:
+                print(f"Export download failed: {resp.status_code}")
+                return None
+            export_info["_bytes"] = b"".join(resp.iter_content(chunk_size=1 << 20))
+        except Exception as e:
+            print(f"Export download failed: {e}")
+            return None
+    return export_info["_bytes"]